@@ -1,11 +1,16 @@
 from pydantic_settings import BaseSettings
-from typing import List, Optional
+from functools import cached_property
+from typing import Optional, Tuple
 import os
 
 class Settings(BaseSettings):
     # Database
     MONGODB_URL: str = "mongodb://localhost:27017"
     DATABASE_NAME: str = "youtube_scheduler"
+    MONGODB_MAX_POOL_SIZE: int = 50
+    MONGODB_MIN_POOL_SIZE: int = 10
+    MONGODB_MAX_IDLE_TIME_MS: int = 300000  # 5 minutes
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = 2000
     
     # JWT
     SECRET_KEY: str = "your-secret-key-change-in-production"
@@ -37,17 +42,17 @@ class Settings(BaseSettings):
     # Timezone
     DEFAULT_TIMEZONE: str = "UTC"
     
-    @property
-    def allowed_origins_list(self) -> List[str]:
-        return [origin.strip() for origin in self.ALLOWED_ORIGINS.split(",")]
+    @cached_property
+    def allowed_origins_list(self) -> Tuple[str, ...]:
+        return tuple(origin.strip() for origin in self.ALLOWED_ORIGINS.split(","))
     
-    @property
-    def allowed_video_types_list(self) -> List[str]:
-        return [video_type.strip() for video_type in self.ALLOWED_VIDEO_TYPES.split(",")]
+    @cached_property
+    def allowed_video_types_list(self) -> Tuple[str, ...]:
+        return tuple(video_type.strip() for video_type in self.ALLOWED_VIDEO_TYPES.split(","))
     
-    @property
-    def youtube_scopes_list(self) -> List[str]:
-        return [scope.strip() for scope in self.YOUTUBE_SCOPES.split(",")]
+    @cached_property
+    def youtube_scopes_list(self) -> Tuple[str, ...]:
+        return tuple(scope.strip() for scope in self.YOUTUBE_SCOPES.split(","))
     
     class Config:
         env_file = ".env"
@@ -1,4 +1,5 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo.errors import OperationFailure
 from app.config import settings
 import logging
 
@@ -13,16 +14,64 @@ db = Database()
 async def connect_to_mongo():
     """Create database connection"""
     try:
-        db.client = AsyncIOMotorClient(settings.MONGODB_URL)
+        db.client = AsyncIOMotorClient(
+            settings.MONGODB_URL,
+            maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+            minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+            maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+            waitQueueTimeoutMS=settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS
+        )
         db.database = db.client[settings.DATABASE_NAME]
         
-        # Test the connection
+        # Test the connection; this also starts pre-warming minPoolSize connections
         await db.client.admin.command('ping')
         logger.info("Connected to MongoDB")
+        
+        await create_indexes()
     except Exception as e:
         logger.error(f"Could not connect to MongoDB: {e}")
         raise
 
+async def create_unique_index(collection, keys, **kwargs):
+    """Create a unique index, carrying on without it when existing documents collide"""
+    try:
+        await collection.create_index(keys, unique=True, background=True, **kwargs)
+    except OperationFailure as e:
+        # Duplicates written before the index existed have to be merged first;
+        # until then the upserts still work, just without the uniqueness guarantee
+        logger.error(f"Could not create unique index {keys} on {collection.name}: {e}")
+
+async def create_indexes():
+    """Create indexes for the hot query shapes"""
+    videos = db.database.videos
+    await videos.create_index([("user_id", 1), ("status", 1)], background=True)
+    # Partial indexes only cover scheduled videos, which keeps them small
+    await videos.create_index(
+        [("user_id", 1), ("schedule.upload_scheduled_at", 1)],
+        partialFilterExpression={"schedule.upload_scheduled_at": {"$exists": True}},
+        background=True
+    )
+    await videos.create_index(
+        [("user_id", 1), ("schedule.delete_scheduled_at", 1)],
+        partialFilterExpression={"schedule.delete_scheduled_at": {"$exists": True}},
+        background=True
+    )
+    await videos.create_index([("user_id", 1), ("updated_at", -1)], background=True)
+    await videos.create_index([("user_id", 1), ("created_at", -1)], background=True)
+    # Backs cleanup_expired_videos, which scans across all users
+    await videos.create_index([("status", 1), ("schedule.delete_scheduled_at", 1)], background=True)
+    
+    youtube_channels = db.database.youtube_channels
+    await youtube_channels.create_index([("user_id", 1), ("is_active", 1), ("created_at", -1)], background=True)
+    await youtube_channels.create_index([("user_id", 1), ("created_at", -1)], background=True)
+    await youtube_channels.create_index([("user_id", 1), ("updated_at", -1)], background=True)
+    # Backs the authenticate upsert so concurrent callbacks cannot create duplicates
+    await create_unique_index(youtube_channels, [("user_id", 1), ("channel_id", 1)])
+    
+    # Backs the login upsert so concurrent first logins cannot create duplicate users
+    await create_unique_index(db.database.users, "google_id")
+    logger.info("MongoDB indexes ensured")
+
 async def close_mongo_connection():
     """Close database connection"""
     if db.client:
@@ -32,3 +81,7 @@ async def close_mongo_connection():
 def get_database():
     """Get database instance"""
     return db.database
+
+async def get_db() -> AsyncIOMotorDatabase:
+    """Dependency returning the shared database handle"""
+    return db.database
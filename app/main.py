@@ -1,15 +1,20 @@
-from fastapi import FastAPI, HTTPException, Depends
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.security import HTTPBearer
+from fastapi import FastAPI, HTTPException, Depends, Request, status
+from bson.errors import InvalidId
+from pymongo.errors import ConnectionFailure
 import uvicorn
+import logging
+import os
 from contextlib import asynccontextmanager
 
 from app.config import settings
 from app.database import connect_to_mongo, close_mongo_connection
+from app.utils.cors import CORSMiddleware
+from app.utils.errors import InternalErrorMiddleware
+from app.utils.limits import MULTIPART_OVERHEAD, UploadSizeLimitMiddleware
+from app.utils.responses import ORJSONResponse
 from app.routers import auth, videos, youtube, dashboard
 
-# Security scheme
-security = HTTPBearer()
+logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -23,18 +28,43 @@ app = FastAPI(
     title="YouTube Video Scheduler",
     description="A web-based YouTube video upload and deletion agent with scheduling capabilities",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
+# Oversized uploads are refused while the body streams in, before the form is parsed
+app.add_middleware(
+    UploadSizeLimitMiddleware,
+    path="/api/videos/upload",
+    max_body_size=settings.MAX_FILE_SIZE + MULTIPART_OVERHEAD,
+    detail=f"File too large. Maximum size is {settings.MAX_FILE_SIZE // (1024 * 1024)}MB."
+)
+
+# Unexpected errors become a JSON 500 here; added before CORS so it sits inside it
+app.add_middleware(InternalErrorMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.allowed_origins_list,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=settings.allowed_origins_list
 )
 
+# Exception handlers, so route handlers only raise HTTPException for expected failures;
+# anything else is answered by InternalErrorMiddleware
+@app.exception_handler(InvalidId)
+async def invalid_id_handler(request: Request, exc: InvalidId):
+    return ORJSONResponse(status_code=status.HTTP_400_BAD_REQUEST, content={"detail": str(exc)})
+
+# Only connectivity errors mean the database is unavailable; query and write
+# errors will not succeed on retry and become a 500 in InternalErrorMiddleware
+@app.exception_handler(ConnectionFailure)
+async def database_unavailable_handler(request: Request, exc: ConnectionFailure):
+    logger.error(f"Database unavailable on {request.method} {request.url.path}: {exc}")
+    return ORJSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Database unavailable"}
+    )
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
 app.include_router(videos.router, prefix="/api/videos", tags=["videos"])
@@ -51,8 +81,10 @@ async def health_check():
 
 if __name__ == "__main__":
     uvicorn.run(
-        "main:app",
+        "app.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True
+        loop="uvloop",
+        http="httptools",
+        workers=os.cpu_count()
     )
@@ -1,48 +1,38 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field
 from typing import Optional, List
 from datetime import datetime
-from bson import ObjectId
+from app.models.object_id import PyObjectId
+import re
 
-class PyObjectId(ObjectId):
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
 
-    @classmethod
-    def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid objectid")
-        return ObjectId(v)
-
-    @classmethod
-    def __modify_schema__(cls, field_schema):
-        field_schema.update(type="string")
+def validate_email(value: str) -> str:
+    if not EMAIL_PATTERN.match(value):
+        raise ValueError("Invalid email address")
+    return value
 
 class UserBase(BaseModel):
-    email: EmailStr
+    email: str
     name: str
     google_id: str
     picture: Optional[str] = None
 
-class UserCreate(UserBase):
-    pass
-
 class UserUpdate(BaseModel):
     name: Optional[str] = None
     picture: Optional[str] = None
 
 class User(UserBase):
-    id: PyObjectId = None
+    # Documents carry the id as _id; responses still expose it as id
+    id: Optional[PyObjectId] = Field(default=None, validation_alias=AliasChoices("_id", "id"))
     created_at: datetime = None
     updated_at: datetime = None
     is_active: bool = True
     youtube_channels: List[PyObjectId] = []
     
-    class Config:
-        allow_population_by_field_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str}
-        schema_extra = {
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True,
+        json_schema_extra={
             "example": {
                 "email": "user@example.com",
                 "name": "John Doe",
@@ -51,3 +41,4 @@ class User(UserBase):
                 "is_active": True
             }
         }
+    )
@@ -1,30 +1,16 @@
-from pydantic import BaseModel, Field
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
-from bson import ObjectId
+from app.models.object_id import PyObjectId
 from enum import Enum
 
-class PyObjectId(ObjectId):
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
-
-    @classmethod
-    def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid objectid")
-        return ObjectId(v)
-
-    @classmethod
-    def __modify_schema__(cls, field_schema):
-        field_schema.update(type="string")
-
 class VideoStatus(str, Enum):
     UPLOADING = "uploading"
     UPLOADED = "uploaded"
     SCHEDULED = "scheduled"
     PROCESSING = "processing"
     PUBLISHED = "published"
+    DELETING = "deleting"
     FAILED = "failed"
     DELETED = "deleted"
 
@@ -41,7 +27,7 @@ class VideoBase(BaseModel):
     thumbnail_url: Optional[str] = None
 
 class VideoCreate(VideoBase):
-    file_path: str
+    file_path: Optional[str] = None
     file_size: int
     duration: Optional[int] = None
     mime_type: str
@@ -62,9 +48,10 @@ class VideoSchedule(BaseModel):
     delete_job_id: Optional[str] = None
 
 class Video(VideoBase):
-    id: PyObjectId = None
+    # Documents carry the id as _id; responses still expose it as id
+    id: Optional[PyObjectId] = Field(default=None, validation_alias=AliasChoices("_id", "id"))
     user_id: PyObjectId
-    file_path: str
+    file_path: Optional[str] = None
     file_size: int
     duration: Optional[int] = None
     mime_type: str
@@ -74,11 +61,10 @@ class Video(VideoBase):
     created_at: datetime = None
     updated_at: datetime = None
     
-    class Config:
-        allow_population_by_field_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str}
-        schema_extra = {
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True,
+        json_schema_extra={
             "example": {
                 "title": "My Awesome Video",
                 "description": "This is a great video",
@@ -90,3 +76,4 @@ class Video(VideoBase):
                 "status": "uploaded"
             }
         }
+    )
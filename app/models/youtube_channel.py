@@ -1,22 +1,7 @@
-from pydantic import BaseModel
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field
 from typing import Optional, Dict, Any
 from datetime import datetime
-from bson import ObjectId
-
-class PyObjectId(ObjectId):
-    @classmethod
-    def __get_validators__(cls):
-        yield cls.validate
-
-    @classmethod
-    def validate(cls, v):
-        if not ObjectId.is_valid(v):
-            raise ValueError("Invalid objectid")
-        return ObjectId(v)
-
-    @classmethod
-    def __modify_schema__(cls, field_schema):
-        field_schema.update(type="string")
+from app.models.object_id import PyObjectId
 
 class YouTubeChannelBase(BaseModel):
     channel_id: str
@@ -44,7 +29,8 @@ class YouTubeChannelUpdate(BaseModel):
     token_expires_at: Optional[datetime] = None
 
 class YouTubeChannel(YouTubeChannelBase):
-    id: PyObjectId = None
+    # Documents carry the id as _id; responses still expose it as id
+    id: Optional[PyObjectId] = Field(default=None, validation_alias=AliasChoices("_id", "id"))
     user_id: PyObjectId
     access_token: str
     refresh_token: str
@@ -53,11 +39,10 @@ class YouTubeChannel(YouTubeChannelBase):
     created_at: datetime = None
     updated_at: datetime = None
     
-    class Config:
-        allow_population_by_field_name = True
-        arbitrary_types_allowed = True
-        json_encoders = {ObjectId: str}
-        schema_extra = {
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True,
+        json_schema_extra={
             "example": {
                 "channel_id": "UC1234567890",
                 "title": "My YouTube Channel",
@@ -69,3 +54,4 @@ class YouTubeChannel(YouTubeChannelBase):
                 "is_active": True
             }
         }
+    )
@@ -1,15 +1,45 @@
 from fastapi import APIRouter, HTTPException, status, Depends
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.services.auth_service import auth_service
-from app.utils.security import create_access_token, verify_token
+from app.utils.security import create_access_token, verify_token, get_bearer_token
 from app.models.user import User
 from pydantic import BaseModel
 from typing import Optional
+from cachetools import TTLCache
+import hashlib
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
-security = HTTPBearer()
+
+# Verified token subjects and loaded users, so repeat requests skip the HMAC check and DB lookup
+_token_cache = TTLCache(maxsize=10_000, ttl=60)
+_user_cache = TTLCache(maxsize=10_000, ttl=30)
+
+def _get_token_subject(token: str) -> Optional[str]:
+    """Return the user id of a verified token, verifying it only on a cache miss"""
+    # Keyed by a digest so raw tokens are never held in memory
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    cached = _token_cache.get(key)
+    if cached is not None:
+        user_id, expires_at = cached
+        if expires_at is None or expires_at > time.time():
+            return user_id
+    
+    payload = verify_token(token)
+    user_id = payload.get("sub")
+    if user_id:
+        _token_cache[key] = (user_id, payload.get("exp"))
+    return user_id
+
+async def _get_user(user_id: str) -> Optional[User]:
+    """Get user by ID, served from the short-lived user cache when possible"""
+    user = _user_cache.get(user_id)
+    if user is None:
+        user = await auth_service.get_user_by_id(user_id)
+        if user:
+            _user_cache[user_id] = user
+    return user
 
 class GoogleTokenRequest(BaseModel):
     token: str
@@ -28,6 +58,7 @@ async def google_login(request: GoogleTokenRequest):
         
         # Get or create user
         user = await auth_service.get_or_create_user(user_data)
+        _user_cache.pop(str(user.id), None)
         
         # Create JWT token
         access_token = create_access_token(
@@ -48,12 +79,11 @@ async def google_login(request: GoogleTokenRequest):
         )
 
 @router.get("/me", response_model=User)
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def get_current_user(token: str = Depends(get_bearer_token)):
     """Get current authenticated user"""
     try:
         # Verify JWT token
-        payload = verify_token(credentials.credentials)
-        user_id = payload.get("sub")
+        user_id = _get_token_subject(token)
         
         if not user_id:
             raise HTTPException(
@@ -62,7 +92,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             )
         
         # Get user from database
-        user = await auth_service.get_user_by_id(user_id)
+        user = await _get_user(user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -86,11 +116,10 @@ async def logout():
     return {"message": "Successfully logged out"}
 
 # Dependency to get current user
-async def get_current_user_dependency(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
+async def get_current_user_dependency(token: str = Depends(get_bearer_token)) -> User:
     """Dependency to get current user for other routers"""
     try:
-        payload = verify_token(credentials.credentials)
-        user_id = payload.get("sub")
+        user_id = _get_token_subject(token)
         
         if not user_id:
             raise HTTPException(
@@ -98,7 +127,7 @@ async def get_current_user_dependency(credentials: HTTPAuthorizationCredentials
                 detail="Invalid token"
             )
         
-        user = await auth_service.get_user_by_id(user_id)
+        user = await _get_user(user_id)
         if not user:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -1,259 +1,256 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, Depends, Query
 from app.routers.auth import get_current_user_dependency
 from app.models.user import User
 from app.models.video import VideoStatus
-from app.database import get_database
+from app.database import get_db
+from motor.motor_asyncio import AsyncIOMotorDatabase
 from typing import Dict, Any, List
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from bson import ObjectId
+from cachetools import TTLCache
+import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Per-user dashboard stats, short-lived so UI polling hits the database once per window
+stats_cache = TTLCache(maxsize=10_000, ttl=3)
+
+def invalidate_dashboard_stats(user_id) -> None:
+    """Drop cached dashboard stats after a user's videos change"""
+    stats_cache.pop(str(user_id), None)
+
 @router.get("/stats")
 async def get_dashboard_stats(
+    db: AsyncIOMotorDatabase = Depends(get_db),
     current_user: User = Depends(get_current_user_dependency)
 ):
     """Get dashboard statistics"""
-    try:
-        db = get_database()
-        
-        # Get video counts by status
-        video_stats = {}
-        for status in VideoStatus:
-            count = await db.videos.count_documents({
-                "user_id": current_user.id,
-                "status": status.value
-            })
-            video_stats[status.value] = count
-        
-        # Get total videos
-        total_videos = await db.videos.count_documents({"user_id": current_user.id})
-        
-        # Get scheduled uploads count
-        scheduled_uploads = await db.videos.count_documents({
-            "user_id": current_user.id,
-            "schedule.upload_scheduled_at": {"$exists": True, "$gt": datetime.utcnow()}
-        })
-        
-        # Get scheduled deletions count
-        scheduled_deletions = await db.videos.count_documents({
-            "user_id": current_user.id,
-            "schedule.delete_scheduled_at": {"$exists": True, "$gt": datetime.utcnow()}
-        })
-        
-        # Get YouTube channels count
-        youtube_channels = await db.youtube_channels.count_documents({
+    cache_key = str(current_user.id)
+    cached_stats = stats_cache.get(cache_key)
+    if cached_stats is not None:
+        return cached_stats
+    
+    now = datetime.utcnow()
+    
+    # Get all video counts and storage usage in a single round trip
+    stats_pipeline = [
+        {"$match": {"user_id": current_user.id}},
+        {"$facet": {
+            "by_status": [{"$group": {"_id": "$status", "n": {"$sum": 1}}}],
+            "storage": [{"$group": {"_id": None, "total": {"$sum": "$file_size"}}}],
+            "scheduled_uploads": [
+                {"$match": {"schedule.upload_scheduled_at": {"$gt": now}}},
+                {"$count": "n"}
+            ],
+            "scheduled_deletions": [
+                {"$match": {"schedule.delete_scheduled_at": {"$gt": now}}},
+                {"$count": "n"}
+            ]
+        }}
+    ]
+    
+    # Get YouTube channels count alongside the video stats
+    stats_result, youtube_channels = await asyncio.gather(
+        db.videos.aggregate(stats_pipeline).to_list(1),
+        db.youtube_channels.count_documents({
             "user_id": current_user.id,
             "is_active": True
         })
-        
-        # Get storage usage (sum of file sizes)
-        storage_pipeline = [
-            {"$match": {"user_id": current_user.id}},
-            {"$group": {"_id": None, "total_size": {"$sum": "$file_size"}}}
-        ]
-        storage_result = await db.videos.aggregate(storage_pipeline).to_list(1)
-        total_storage = storage_result[0]["total_size"] if storage_result else 0
-        
-        return {
-            "total_videos": total_videos,
-            "video_stats": video_stats,
-            "scheduled_uploads": scheduled_uploads,
-            "scheduled_deletions": scheduled_deletions,
-            "youtube_channels": youtube_channels,
-            "total_storage_bytes": total_storage,
-            "total_storage_mb": round(total_storage / (1024 * 1024), 2)
-        }
-        
-    except Exception as e:
-        logger.error(f"Error getting dashboard stats: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to get dashboard statistics"
-        )
+    )
+    facets = stats_result[0] if stats_result else {}
+    
+    # Fan out the facet results
+    status_counts = {row["_id"]: row["n"] for row in facets.get("by_status", [])}
+    video_stats = {status.value: status_counts.get(status.value, 0) for status in VideoStatus}
+    total_videos = sum(status_counts.values())
+    scheduled_uploads = facets["scheduled_uploads"][0]["n"] if facets.get("scheduled_uploads") else 0
+    scheduled_deletions = facets["scheduled_deletions"][0]["n"] if facets.get("scheduled_deletions") else 0
+    total_storage = facets["storage"][0]["total"] if facets.get("storage") else 0
+    
+    stats = {
+        "total_videos": total_videos,
+        "video_stats": video_stats,
+        "scheduled_uploads": scheduled_uploads,
+        "scheduled_deletions": scheduled_deletions,
+        "youtube_channels": youtube_channels,
+        "total_storage_bytes": total_storage,
+        "total_storage_mb": round(total_storage / (1024 * 1024), 2)
+    }
+    stats_cache[cache_key] = stats
+    
+    return stats
+
 
 @router.get("/recent")
 async def get_recent_activities(
-    limit: int = 10,
+    limit: int = Query(10, ge=1, le=100),
+    db: AsyncIOMotorDatabase = Depends(get_db),
     current_user: User = Depends(get_current_user_dependency)
 ):
     """Get recent activities"""
-    try:
-        db = get_database()
-        activities = []
-        
-        # Get recent videos
-        async for video_doc in db.videos.find(
-            {"user_id": current_user.id}
-        ).sort("updated_at", -1).limit(limit):
-            activity = {
-                "type": "video",
-                "id": str(video_doc["_id"]),
-                "title": video_doc["title"],
-                "status": video_doc["status"],
-                "created_at": video_doc["created_at"],
-                "updated_at": video_doc["updated_at"]
-            }
-            
-            # Add scheduling info if available
-            if video_doc.get("schedule", {}).get("upload_scheduled_at"):
-                activity["upload_scheduled_at"] = video_doc["schedule"]["upload_scheduled_at"]
-            
-            if video_doc.get("schedule", {}).get("delete_scheduled_at"):
-                activity["delete_scheduled_at"] = video_doc["schedule"]["delete_scheduled_at"]
-            
-            activities.append(activity)
-        
-        # Get recent YouTube channel connections
-        async for channel_doc in db.youtube_channels.find(
-            {"user_id": current_user.id}
-        ).sort("created_at", -1).limit(5):
-            activities.append({
-                "type": "youtube_channel",
-                "id": str(channel_doc["_id"]),
-                "title": channel_doc["title"],
-                "channel_id": channel_doc["channel_id"],
-                "created_at": channel_doc["created_at"],
-                "updated_at": channel_doc["updated_at"]
-            })
-        
-        # Sort all activities by updated_at
-        activities.sort(key=lambda x: x["updated_at"], reverse=True)
-        
-        return activities[:limit]
-        
-    except Exception as e:
-        logger.error(f"Error getting recent activities: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to get recent activities"
-        )
+    # Merge recent videos and YouTube channel connections, sorted and limited server-side
+    activities_pipeline = [
+        {"$match": {"user_id": current_user.id}},
+        {"$sort": {"updated_at": -1}},
+        {"$limit": limit},
+        {"$project": {
+            "_id": 0,
+            "type": {"$literal": "video"},
+            "id": {"$toString": "$_id"},
+            "title": 1,
+            "status": 1,
+            "created_at": 1,
+            "updated_at": 1,
+            "upload_scheduled_at": {"$ifNull": ["$schedule.upload_scheduled_at", "$$REMOVE"]},
+            "delete_scheduled_at": {"$ifNull": ["$schedule.delete_scheduled_at", "$$REMOVE"]}
+        }},
+        {"$unionWith": {
+            "coll": "youtube_channels",
+            "pipeline": [
+                {"$match": {"user_id": current_user.id}},
+                {"$sort": {"updated_at": -1}},
+                {"$limit": limit},
+                {"$project": {
+                    "_id": 0,
+                    "type": {"$literal": "youtube_channel"},
+                    "id": {"$toString": "$_id"},
+                    "title": 1,
+                    "channel_id": 1,
+                    "created_at": 1,
+                    "updated_at": 1
+                }}
+            ]
+        }},
+        {"$sort": {"updated_at": -1}},
+        {"$limit": limit}
+    ]
+    
+    return await db.videos.aggregate(activities_pipeline).to_list(None)
+
 
 @router.get("/upcoming")
 async def get_upcoming_schedules(
     days: int = 7,
+    db: AsyncIOMotorDatabase = Depends(get_db),
     current_user: User = Depends(get_current_user_dependency)
 ):
     """Get upcoming scheduled uploads and deletions"""
-    try:
-        db = get_database()
-        upcoming = []
-        
-        # Get upcoming uploads
-        uploads = []
-        async for video_doc in db.videos.find({
+    now = datetime.utcnow()
+    window_end = now + timedelta(days=days)
+    
+    # Get upcoming uploads and deletions in one round trip, sorted server-side
+    upcoming_pipeline = [
+        {"$match": {
             "user_id": current_user.id,
             "schedule.upload_scheduled_at": {
-                "$exists": True,
-                "$gte": datetime.utcnow(),
-                "$lte": datetime.utcnow() + timedelta(days=days)
-            }
-        }).sort("schedule.upload_scheduled_at", 1):
-            uploads.append({
-                "type": "upload",
-                "video_id": str(video_doc["_id"]),
-                "title": video_doc["title"],
-                "scheduled_at": video_doc["schedule"]["upload_scheduled_at"],
-                "status": video_doc["status"]
-            })
-        
-        # Get upcoming deletions
-        deletions = []
-        async for video_doc in db.videos.find({
-            "user_id": current_user.id,
-            "schedule.delete_scheduled_at": {
-                "$exists": True,
-                "$gte": datetime.utcnow(),
-                "$lte": datetime.utcnow() + timedelta(days=days)
+                "$gte": now,
+                "$lte": window_end
             }
-        }).sort("schedule.delete_scheduled_at", 1):
-            deletions.append({
-                "type": "delete",
-                "video_id": str(video_doc["_id"]),
-                "title": video_doc["title"],
-                "scheduled_at": video_doc["schedule"]["delete_scheduled_at"],
-                "youtube_video_id": video_doc["schedule"].get("youtube_video_id")
-            })
-        
-        # Combine and sort
-        upcoming = uploads + deletions
-        upcoming.sort(key=lambda x: x["scheduled_at"])
-        
-        return upcoming
-        
-    except Exception as e:
-        logger.error(f"Error getting upcoming schedules: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to get upcoming schedules"
-        )
+        }},
+        {"$project": {
+            "_id": 0,
+            "type": {"$literal": "upload"},
+            "video_id": {"$toString": "$_id"},
+            "title": 1,
+            "scheduled_at": "$schedule.upload_scheduled_at",
+            "status": 1
+        }},
+        {"$unionWith": {
+            "coll": "videos",
+            "pipeline": [
+                {"$match": {
+                    "user_id": current_user.id,
+                    "schedule.delete_scheduled_at": {
+                        "$gte": now,
+                        "$lte": window_end
+                    }
+                }},
+                {"$project": {
+                    "_id": 0,
+                    "type": {"$literal": "delete"},
+                    "video_id": {"$toString": "$_id"},
+                    "title": 1,
+                    "scheduled_at": "$schedule.delete_scheduled_at",
+                    "youtube_video_id": {"$ifNull": ["$schedule.youtube_video_id", None]}
+                }}
+            ]
+        }},
+        {"$sort": {"scheduled_at": 1}}
+    ]
+    upcoming = await db.videos.aggregate(upcoming_pipeline).to_list(None)
+    
+    return upcoming
+
 
 @router.get("/calendar")
 async def get_calendar_data(
     year: int,
     month: int,
+    db: AsyncIOMotorDatabase = Depends(get_db),
     current_user: User = Depends(get_current_user_dependency)
 ):
     """Get calendar data for a specific month"""
-    try:
-        from datetime import date
-        import calendar
-        
-        # Get start and end of month
-        start_date = date(year, month, 1)
-        if month == 12:
-            end_date = date(year + 1, 1, 1)
-        else:
-            end_date = date(year, month + 1, 1)
-        
-        db = get_database()
-        calendar_data = {}
-        
-        # Get uploads for the month
-        async for video_doc in db.videos.find({
+    # Get start and end of month as datetimes; BSON has no date-only type
+    start_date = datetime(year, month, 1)
+    if month == 12:
+        end_date = datetime(year + 1, 1, 1)
+    else:
+        end_date = datetime(year, month + 1, 1)
+    
+    calendar_data = {}
+    
+    # Get uploads and deletions for the month bucketed by day of month in one round trip
+    calendar_pipeline = [
+        {"$match": {
             "user_id": current_user.id,
             "schedule.upload_scheduled_at": {
-                "$exists": True,
-                "$gte": start_date,
-                "$lt": end_date
-            }
-        }):
-            scheduled_date = video_doc["schedule"]["upload_scheduled_at"].date()
-            if scheduled_date not in calendar_data:
-                calendar_data[scheduled_date] = {"uploads": [], "deletions": []}
-            
-            calendar_data[scheduled_date]["uploads"].append({
-                "video_id": str(video_doc["_id"]),
-                "title": video_doc["title"],
-                "scheduled_at": video_doc["schedule"]["upload_scheduled_at"]
-            })
-        
-        # Get deletions for the month
-        async for video_doc in db.videos.find({
-            "user_id": current_user.id,
-            "schedule.delete_scheduled_at": {
-                "$exists": True,
                 "$gte": start_date,
                 "$lt": end_date
             }
-        }):
-            scheduled_date = video_doc["schedule"]["delete_scheduled_at"].date()
-            if scheduled_date not in calendar_data:
-                calendar_data[scheduled_date] = {"uploads": [], "deletions": []}
-            
-            calendar_data[scheduled_date]["deletions"].append({
-                "video_id": str(video_doc["_id"]),
-                "title": video_doc["title"],
-                "scheduled_at": video_doc["schedule"]["delete_scheduled_at"]
-            })
-        
-        return calendar_data
-        
-    except Exception as e:
-        logger.error(f"Error getting calendar data: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to get calendar data"
-        )
+        }},
+        {"$group": {
+            "_id": {
+                "day": {"$dayOfMonth": "$schedule.upload_scheduled_at"},
+                "kind": {"$literal": "uploads"}
+            },
+            "items": {"$push": {
+                "video_id": {"$toString": "$_id"},
+                "title": "$title",
+                "scheduled_at": "$schedule.upload_scheduled_at"
+            }}
+        }},
+        {"$unionWith": {
+            "coll": "videos",
+            "pipeline": [
+                {"$match": {
+                    "user_id": current_user.id,
+                    "schedule.delete_scheduled_at": {
+                        "$gte": start_date,
+                        "$lt": end_date
+                    }
+                }},
+                {"$group": {
+                    "_id": {
+                        "day": {"$dayOfMonth": "$schedule.delete_scheduled_at"},
+                        "kind": {"$literal": "deletions"}
+                    },
+                    "items": {"$push": {
+                        "video_id": {"$toString": "$_id"},
+                        "title": "$title",
+                        "scheduled_at": "$schedule.delete_scheduled_at"
+                    }}
+                }}
+            ]
+        }},
+        {"$sort": {"_id.day": 1}}
+    ]
+    
+    async for bucket in db.videos.aggregate(calendar_pipeline):
+        day_key = date(year, month, bucket["_id"]["day"]).isoformat()
+        if day_key not in calendar_data:
+            calendar_data[day_key] = {"uploads": [], "deletions": []}
+        calendar_data[day_key][bucket["_id"]["kind"]] = bucket["items"]
+    
+    return calendar_data
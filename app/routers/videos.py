@@ -1,18 +1,27 @@
 from fastapi import APIRouter, HTTPException, status, Depends, UploadFile, File, Form
+from fastapi.concurrency import run_in_threadpool
 from app.routers.auth import get_current_user_dependency
+from app.routers.dashboard import invalidate_dashboard_stats
 from app.models.user import User
 from app.models.video import Video, VideoCreate, VideoUpdate, VideoStatus, VideoPrivacy
 from app.services.drive_service import drive_service
-from app.database import get_database
+from app.tasks.upload_tasks import upload_video_to_youtube, delete_video_from_youtube, get_upload_progress
+from app.config import settings
+from app.database import get_db
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.utils.responses import ORJSONResponse
+from app.utils.ids import parse_object_id
 from typing import List, Optional
-from datetime import datetime
-from bson import ObjectId
+from datetime import datetime, timezone
+from pymongo import ReturnDocument
 import logging
-import os
-import tempfile
+import uuid
 
 logger = logging.getLogger(__name__)
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Only fetch the fields the Video response model reads
+VIDEO_PROJECTION = {"_id": 1, **{field: 1 for field in Video.model_fields if field != "id"}}
 
 @router.post("/upload", response_model=Video)
 async def upload_video(
@@ -21,388 +30,336 @@ async def upload_video(
     description: str = Form(""),
     tags: str = Form(""),
     privacy: str = Form("private"),
+    db: AsyncIOMotorDatabase = Depends(get_db),
     current_user: User = Depends(get_current_user_dependency)
 ):
     """Upload video to Google Drive"""
-    try:
-        # Validate file type
-        if file.content_type not in settings.allowed_video_types_list:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid file type. Only video files are allowed."
-            )
-        
-        # Validate file size (100MB limit)
-        file_size = 0
-        content = await file.read()
-        file_size = len(content)
-        
-        if file_size > settings.MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="File too large. Maximum size is 100MB."
-            )
-        
-        # Save file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as temp_file:
-            temp_file.write(content)
-            temp_file_path = temp_file.name
-        
-        try:
-            # Get user's Google credentials (you'll need to implement this)
-            # For now, we'll create a placeholder
-            credentials = None  # This should be retrieved from user's stored tokens
-            
-            if not credentials:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Google Drive authentication required. Please connect your Google account."
-                )
-            
-            # Upload to Google Drive
-            drive_result = await drive_service.upload_video(
-                temp_file_path,
-                file.filename,
-                credentials
-            )
-            
-            # Parse tags
-            tag_list = [tag.strip() for tag in tags.split(",") if tag.strip()]
-            
-            # Create video document
-            video_data = VideoCreate(
-                title=title,
-                description=description,
-                tags=tag_list,
-                privacy=VideoPrivacy(privacy),
-                file_path=temp_file_path,
-                file_size=file_size,
-                mime_type=file.content_type
-            )
-            
-            video_dict = video_data.dict()
-            video_dict.update({
-                "user_id": current_user.id,
-                "google_drive_file_id": drive_result["file_id"],
-                "status": VideoStatus.UPLOADED,
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
-            })
-            
-            # Save to database
-            db = get_database()
-            result = await db.videos.insert_one(video_dict)
-            
-            # Get created video
-            video_doc = await db.videos.find_one({"_id": result.inserted_id})
-            video = Video(**video_doc)
-            
-            return video
-            
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error uploading video: {e}")
+    # Validate file type
+    if file.content_type not in settings.allowed_video_types_list:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to upload video"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid file type. Only video files are allowed."
         )
+    
+    # UploadSizeLimitMiddleware capped the body while it streamed in; the form
+    # overhead it allows for means the file itself still needs checking here
+    file_size = file.size
+    
+    if file_size > settings.MAX_FILE_SIZE:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"File too large. Maximum size is {settings.MAX_FILE_SIZE // (1024 * 1024)}MB."
+        )
+    
+    if file_size == 0:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Uploaded file is empty."
+        )
+    
+    # Get user's Google credentials (you'll need to implement this)
+    # For now, we'll create a placeholder
+    credentials = None  # This should be retrieved from user's stored tokens
+    
+    if not credentials:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Google Drive authentication required. Please connect your Google account."
+        )
+    
+    # Upload to Google Drive straight from the spooled upload, no extra copy to disk;
+    # the client is blocking, so it runs in the threadpool
+    await file.seek(0)
+    drive_result = await run_in_threadpool(
+        drive_service.upload_video,
+        file.file,
+        file.filename,
+        credentials,
+        mime_type=file.content_type
+    )
+    
+    # Parse tags
+    tag_list = [tag.strip() for tag in tags.split(",") if tag.strip()]
+    
+    # Create video document
+    now = datetime.now(timezone.utc)
+    video_data = VideoCreate(
+        title=title,
+        description=description,
+        tags=tag_list,
+        privacy=VideoPrivacy(privacy),
+        file_size=file_size,
+        mime_type=file.content_type
+    )
+    
+    # The upload only lives in the request's spooled file, so no path is stored
+    video_dict = video_data.model_dump(exclude_none=True)
+    video_dict.update({
+        "user_id": current_user.id,
+        "google_drive_file_id": drive_result["file_id"],
+        "status": VideoStatus.UPLOADED,
+        "created_at": now,
+        "updated_at": now
+    })
+    
+    # Save to database
+    result = await db.videos.insert_one(video_dict)
+    invalidate_dashboard_stats(current_user.id)
+    
+    # Get created video
+    video_doc = await db.videos.find_one({"_id": result.inserted_id})
+    video = Video.model_validate(video_doc)
+    
+    return video
+
 
 @router.get("/", response_model=List[Video])
 async def get_videos(
     skip: int = 0,
     limit: int = 100,
+    db: AsyncIOMotorDatabase = Depends(get_db),
     current_user: User = Depends(get_current_user_dependency)
 ):
     """Get user's videos"""
-    try:
-        db = get_database()
-        videos = []
-        
-        async for video_doc in db.videos.find(
-            {"user_id": current_user.id}
-        ).skip(skip).limit(limit).sort("created_at", -1):
-            videos.append(Video(**video_doc))
-        
-        return videos
-        
-    except Exception as e:
-        logger.error(f"Error getting videos: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to get videos"
-        )
+    video_docs = await db.videos.find(
+        {"user_id": current_user.id},
+        VIDEO_PROJECTION
+    ).sort("created_at", -1).skip(skip).limit(limit).to_list(length=limit or None)
+    
+    # Bypass response_model re-validation; the models are serialized once here
+    return ORJSONResponse([Video.model_validate(video_doc).model_dump(mode="json") for video_doc in video_docs])
+
+
+@router.get("/scheduled", response_model=List[Video])
+async def get_scheduled_videos(
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    current_user: User = Depends(get_current_user_dependency)
+):
+    """Get scheduled videos"""
+    video_docs = await db.videos.find({
+        "user_id": current_user.id,
+        "$or": [
+            {"schedule.upload_scheduled_at": {"$exists": True}},
+            {"schedule.delete_scheduled_at": {"$exists": True}}
+        ]
+    }, VIDEO_PROJECTION).sort("created_at", -1).to_list(None)
+    
+    # Bypass response_model re-validation; the models are serialized once here
+    return ORJSONResponse([Video.model_validate(video_doc).model_dump(mode="json") for video_doc in video_docs])
+
 
 @router.get("/{video_id}", response_model=Video)
 async def get_video(
     video_id: str,
+    db: AsyncIOMotorDatabase = Depends(get_db),
     current_user: User = Depends(get_current_user_dependency)
 ):
     """Get specific video"""
-    try:
-        db = get_database()
-        video_doc = await db.videos.find_one({
-            "_id": ObjectId(video_id),
-            "user_id": current_user.id
-        })
-        
-        if not video_doc:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Video not found"
-            )
-        
-        return Video(**video_doc)
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting video: {e}")
+    video_oid = parse_object_id(video_id)
+    video_doc = await db.videos.find_one({
+        "_id": video_oid,
+        "user_id": current_user.id
+    })
+    
+    if not video_doc:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to get video"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Video not found"
         )
+    
+    return Video.model_validate(video_doc)
+
+
+@router.get("/{video_id}/upload-progress")
+async def get_video_upload_progress(
+    video_id: str,
+    db: AsyncIOMotorDatabase = Depends(get_db),
+    current_user: User = Depends(get_current_user_dependency)
+):
+    """Get the status of a video, with the percent sent while its upload is running"""
+    video_oid = parse_object_id(video_id)
+    video_doc = await db.videos.find_one(
+        {"_id": video_oid, "user_id": current_user.id},
+        projection={"status": 1}
+    )
+    
+    if not video_doc:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Video not found"
+        )
+    
+    # Running uploads are tracked in Redis rather than in the video document
+    progress = await run_in_threadpool(get_upload_progress, video_id)
+    video_status = VideoStatus.PROCESSING if progress is not None else video_doc["status"]
+    return {"video_id": video_id, "status": video_status, "progress": progress}
+
 
 @router.put("/{video_id}", response_model=Video)
 async def update_video(
     video_id: str,
     video_update: VideoUpdate,
+    db: AsyncIOMotorDatabase = Depends(get_db),
     current_user: User = Depends(get_current_user_dependency)
 ):
     """Update video metadata"""
-    try:
-        db = get_database()
-        
-        # Check if video exists and belongs to user
-        video_doc = await db.videos.find_one({
-            "_id": ObjectId(video_id),
-            "user_id": current_user.id
-        })
-        
-        if not video_doc:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Video not found"
-            )
-        
-        # Update video
-        update_data = video_update.dict(exclude_unset=True)
-        update_data["updated_at"] = datetime.utcnow()
-        
-        await db.videos.update_one(
-            {"_id": ObjectId(video_id)},
-            {"$set": update_data}
-        )
-        
-        # Get updated video
-        updated_video_doc = await db.videos.find_one({"_id": ObjectId(video_id)})
-        return Video(**updated_video_doc)
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error updating video: {e}")
+    video_oid = parse_object_id(video_id)
+    
+    # Update video if it exists and belongs to user
+    update_data = video_update.model_dump(exclude_unset=True)
+    update_data["updated_at"] = datetime.now(timezone.utc)
+    
+    updated_video_doc = await db.videos.find_one_and_update(
+        {"_id": video_oid, "user_id": current_user.id},
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
+    )
+    
+    if not updated_video_doc:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to update video"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Video not found"
         )
+    invalidate_dashboard_stats(current_user.id)
+    
+    return Video.model_validate(updated_video_doc)
+
 
 @router.delete("/{video_id}")
 async def delete_video(
     video_id: str,
+    db: AsyncIOMotorDatabase = Depends(get_db),
     current_user: User = Depends(get_current_user_dependency)
 ):
     """Delete video"""
-    try:
-        db = get_database()
-        
-        # Check if video exists and belongs to user
-        video_doc = await db.videos.find_one({
-            "_id": ObjectId(video_id),
-            "user_id": current_user.id
-        })
-        
-        if not video_doc:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Video not found"
-            )
-        
-        # Delete from Google Drive if exists
-        if video_doc.get("google_drive_file_id"):
-            # You'll need to implement this with proper credentials
-            pass
-        
-        # Delete from database
-        await db.videos.delete_one({"_id": ObjectId(video_id)})
-        
-        return {"message": "Video deleted successfully"}
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error deleting video: {e}")
+    video_oid = parse_object_id(video_id)
+    
+    # Delete from database if it exists and belongs to user
+    video_doc = await db.videos.find_one_and_delete(
+        {"_id": video_oid, "user_id": current_user.id},
+        projection={"_id": 1, "google_drive_file_id": 1}
+    )
+    
+    if not video_doc:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to delete video"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Video not found"
         )
+    invalidate_dashboard_stats(current_user.id)
+    
+    # Delete from Google Drive if exists
+    if video_doc.get("google_drive_file_id"):
+        # You'll need to implement this with proper credentials
+        pass
+    
+    return {"message": "Video deleted successfully"}
+
 
 @router.post("/{video_id}/schedule-upload")
 async def schedule_upload(
     video_id: str,
     scheduled_at: datetime,
     youtube_channel_id: str,
+    db: AsyncIOMotorDatabase = Depends(get_db),
     current_user: User = Depends(get_current_user_dependency)
 ):
     """Schedule video upload to YouTube"""
-    try:
-        db = get_database()
-        
-        # Check if video exists and belongs to user
-        video_doc = await db.videos.find_one({
-            "_id": ObjectId(video_id),
-            "user_id": current_user.id
-        })
-        
-        if not video_doc:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Video not found"
-            )
-        
-        # Update video with schedule
-        await db.videos.update_one(
-            {"_id": ObjectId(video_id)},
-            {
-                "$set": {
-                    "schedule.upload_scheduled_at": scheduled_at,
-                    "schedule.youtube_channel_id": ObjectId(youtube_channel_id),
-                    "status": VideoStatus.SCHEDULED,
-                    "updated_at": datetime.utcnow()
-                }
+    video_oid = parse_object_id(video_id)
+    youtube_channel_oid = parse_object_id(youtube_channel_id)
+    
+    # Generate the Celery task id up front so the job id is stored in the same write
+    task_id = uuid.uuid4().hex
+    
+    # Update video with schedule if it exists and belongs to user
+    result = await db.videos.update_one(
+        {"_id": video_oid, "user_id": current_user.id},
+        {
+            "$set": {
+                "schedule.upload_scheduled_at": scheduled_at,
+                "schedule.youtube_channel_id": youtube_channel_oid,
+                "schedule.upload_job_id": task_id,
+                "status": VideoStatus.SCHEDULED,
+                "updated_at": datetime.now(timezone.utc)
             }
-        )
-        
-        # Schedule Celery task
-        from app.tasks.upload_tasks import upload_video_to_youtube
-        task = upload_video_to_youtube.apply_async(
-            args=[str(video_doc["_id"]), str(current_user.id), youtube_channel_id],
-            eta=scheduled_at
-        )
-        
-        # Update video with job ID
-        await db.videos.update_one(
-            {"_id": ObjectId(video_id)},
-            {"$set": {"schedule.upload_job_id": task.id}}
-        )
-        
-        return {"message": "Video scheduled for upload", "job_id": task.id}
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error scheduling upload: {e}")
+        }
+    )
+    
+    if not result.matched_count:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to schedule upload"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Video not found"
         )
+    invalidate_dashboard_stats(current_user.id)
+    
+    # Schedule Celery task
+    upload_video_to_youtube.apply_async(
+        args=[video_id, str(current_user.id), youtube_channel_id],
+        eta=scheduled_at,
+        task_id=task_id
+    )
+    
+    return {"message": "Video scheduled for upload", "job_id": task_id}
+
 
 @router.post("/{video_id}/schedule-delete")
 async def schedule_delete(
     video_id: str,
     scheduled_at: datetime,
+    db: AsyncIOMotorDatabase = Depends(get_db),
     current_user: User = Depends(get_current_user_dependency)
 ):
     """Schedule video deletion from YouTube"""
-    try:
-        db = get_database()
-        
-        # Check if video exists and belongs to user
-        video_doc = await db.videos.find_one({
-            "_id": ObjectId(video_id),
-            "user_id": current_user.id
-        })
-        
-        if not video_doc:
+    video_oid = parse_object_id(video_id)
+    
+    # Generate the Celery task id up front so the job id is stored in the same write
+    task_id = uuid.uuid4().hex
+    
+    # Update video with delete schedule if it belongs to user and is on YouTube
+    video_doc = await db.videos.find_one_and_update(
+        {
+            "_id": video_oid,
+            "user_id": current_user.id,
+            "schedule.youtube_video_id": {"$nin": [None, ""]}
+        },
+        {
+            "$set": {
+                "schedule.delete_scheduled_at": scheduled_at,
+                "schedule.delete_job_id": task_id,
+                "updated_at": datetime.now(timezone.utc)
+            }
+        },
+        # Only the fields passed on to the Celery task
+        projection={"_id": 1, "schedule.youtube_video_id": 1, "schedule.youtube_channel_id": 1}
+    )
+    
+    if not video_doc:
+        # Only distinguish the failure cause on the error path
+        video_exists = await db.videos.find_one(
+            {"_id": video_oid, "user_id": current_user.id},
+            projection={"_id": 1}
+        )
+        if not video_exists:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Video not found"
             )
-        
-        if not video_doc.get("schedule", {}).get("youtube_video_id"):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Video not uploaded to YouTube yet"
-            )
-        
-        # Update video with delete schedule
-        await db.videos.update_one(
-            {"_id": ObjectId(video_id)},
-            {
-                "$set": {
-                    "schedule.delete_scheduled_at": scheduled_at,
-                    "updated_at": datetime.utcnow()
-                }
-            }
-        )
-        
-        # Schedule Celery task
-        from app.tasks.upload_tasks import delete_video_from_youtube
-        task = delete_video_from_youtube.apply_async(
-            args=[
-                str(video_doc["_id"]),
-                video_doc["schedule"]["youtube_video_id"],
-                str(current_user.id),
-                str(video_doc["schedule"].get("youtube_channel_id", ""))
-            ],
-            eta=scheduled_at
-        )
-        
-        # Update video with job ID
-        await db.videos.update_one(
-            {"_id": ObjectId(video_id)},
-            {"$set": {"schedule.delete_job_id": task.id}}
-        )
-        
-        return {"message": "Video scheduled for deletion", "job_id": task.id}
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error scheduling deletion: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to schedule deletion"
-        )
-
-@router.get("/scheduled", response_model=List[Video])
-async def get_scheduled_videos(
-    current_user: User = Depends(get_current_user_dependency)
-):
-    """Get scheduled videos"""
-    try:
-        db = get_database()
-        videos = []
-        
-        async for video_doc in db.videos.find({
-            "user_id": current_user.id,
-            "$or": [
-                {"schedule.upload_scheduled_at": {"$exists": True}},
-                {"schedule.delete_scheduled_at": {"$exists": True}}
-            ]
-        }).sort("created_at", -1):
-            videos.append(Video(**video_doc))
-        
-        return videos
-        
-    except Exception as e:
-        logger.error(f"Error getting scheduled videos: {e}")
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to get scheduled videos"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Video not uploaded to YouTube yet"
         )
+    
+    invalidate_dashboard_stats(current_user.id)
+    
+    # Schedule Celery task
+    delete_video_from_youtube.apply_async(
+        args=[
+            str(video_doc["_id"]),
+            video_doc["schedule"]["youtube_video_id"],
+            str(current_user.id),
+            str(video_doc["schedule"].get("youtube_channel_id", ""))
+        ],
+        eta=scheduled_at,
+        task_id=task_id
+    )
+    
+    return {"message": "Video scheduled for deletion", "job_id": task_id}
@@ -1,17 +1,25 @@
 from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi.concurrency import run_in_threadpool
 from app.routers.auth import get_current_user_dependency
 from app.models.user import User
-from app.models.youtube_channel import YouTubeChannel, YouTubeChannelCreate, YouTubeChannelUpdate
+from app.models.youtube_channel import YouTubeChannel, YouTubeChannelUpdate
 from app.services.youtube_service import youtube_service
-from app.database import get_database
+from app.services.credentials import get_credentials, get_credentials_from_token, refresh_credentials
+from app.database import get_db
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from app.utils.responses import ORJSONResponse
+from app.utils.ids import parse_object_id
 from typing import List, Optional
-from datetime import datetime
-from bson import ObjectId
+from datetime import datetime, timezone
+from pymongo import ReturnDocument
 from pydantic import BaseModel
 import logging
 
 logger = logging.getLogger(__name__)
-router = APIRouter()
+router = APIRouter(default_response_class=ORJSONResponse)
+
+# Only fetch the fields the YouTubeChannel response model reads
+CHANNEL_PROJECTION = {"_id": 1, **{field: 1 for field in YouTubeChannel.model_fields if field != "id"}}
 
 class YouTubeAuthRequest(BaseModel):
     access_token: str
@@ -20,267 +28,180 @@ class YouTubeAuthRequest(BaseModel):
 
 @router.get("/channels", response_model=List[YouTubeChannel])
 async def get_youtube_channels(
+    db: AsyncIOMotorDatabase = Depends(get_db),
     current_user: User = Depends(get_current_user_dependency)
 ):
     """Get user's YouTube channels"""
-    try:
-        db = get_database()
-        channels = []
-        
-        async for channel_doc in db.youtube_channels.find(
-            {"user_id": current_user.id, "is_active": True}
-        ).sort("created_at", -1):
-            channels.append(YouTubeChannel(**channel_doc))
-        
-        return channels
-        
-    except Exception as e:
-        logger.error(f"Error getting YouTube channels: {e}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to get YouTube channels"
-        )
+    channel_docs = await db.youtube_channels.find(
+        {"user_id": current_user.id, "is_active": True},
+        CHANNEL_PROJECTION
+    ).sort("created_at", -1).to_list(None)
+    
+    # Bypass response_model re-validation; the models are serialized once here
+    return ORJSONResponse([YouTubeChannel.model_validate(channel_doc).model_dump(mode="json") for channel_doc in channel_docs])
+
 
 @router.post("/authenticate", response_model=YouTubeChannel)
 async def authenticate_youtube_channel(
     auth_request: YouTubeAuthRequest,
+    db: AsyncIOMotorDatabase = Depends(get_db),
     current_user: User = Depends(get_current_user_dependency)
 ):
     """Authenticate and connect YouTube channel"""
-    try:
-        # Get credentials
-        credentials = youtube_service.get_credentials_from_token(
-            auth_request.access_token,
-            auth_request.refresh_token
+    # Get credentials
+    credentials = get_credentials_from_token(
+        auth_request.access_token,
+        auth_request.refresh_token,
+        auth_request.expires_at
+    )
+    
+    # Refresh credentials if needed
+    credentials = await run_in_threadpool(refresh_credentials, credentials)
+    if not credentials:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Failed to refresh credentials"
         )
-        
-        # Refresh credentials if needed
-        credentials = youtube_service.refresh_credentials(credentials)
-        if not credentials:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Failed to refresh credentials"
-            )
-        
-        # Get channel info
-        channel_info = await youtube_service.get_channel_info(credentials)
-        if not channel_info:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Failed to get channel information"
-            )
-        
-        # Check if channel already exists
-        db = get_database()
-        existing_channel = await db.youtube_channels.find_one({
-            "channel_id": channel_info["channel_id"],
-            "user_id": current_user.id
-        })
-        
-        if existing_channel:
-            # Update existing channel
-            update_data = YouTubeChannelUpdate(
-                title=channel_info["title"],
-                description=channel_info["description"],
-                thumbnail_url=channel_info["thumbnail_url"],
-                subscriber_count=channel_info["subscriber_count"],
-                view_count=channel_info["view_count"],
-                video_count=channel_info["video_count"],
-                access_token=credentials.token,
-                refresh_token=credentials.refresh_token,
-                token_expires_at=credentials.expiry
-            )
-            
-            update_dict = update_data.dict(exclude_unset=True)
-            update_dict["updated_at"] = datetime.utcnow()
-            
-            await db.youtube_channels.update_one(
-                {"_id": existing_channel["_id"]},
-                {"$set": update_dict}
-            )
-            
-            # Get updated channel
-            updated_channel_doc = await db.youtube_channels.find_one(
-                {"_id": existing_channel["_id"]}
-            )
-            return YouTubeChannel(**updated_channel_doc)
-        
-        else:
-            # Create new channel
-            channel_data = YouTubeChannelCreate(
-                channel_id=channel_info["channel_id"],
-                title=channel_info["title"],
-                description=channel_info["description"],
-                thumbnail_url=channel_info["thumbnail_url"],
-                subscriber_count=channel_info["subscriber_count"],
-                view_count=channel_info["view_count"],
-                video_count=channel_info["video_count"],
-                access_token=credentials.token,
-                refresh_token=credentials.refresh_token,
-                token_expires_at=credentials.expiry
-            )
-            
-            channel_dict = channel_data.dict()
-            channel_dict.update({
-                "user_id": current_user.id,
-                "is_active": True,
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
-            })
-            
-            result = await db.youtube_channels.insert_one(channel_dict)
-            
-            # Get created channel
-            channel_doc = await db.youtube_channels.find_one({"_id": result.inserted_id})
-            return YouTubeChannel(**channel_doc)
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error authenticating YouTube channel: {e}")
+    
+    # Get channel info
+    channel_info = await run_in_threadpool(youtube_service.get_channel_info, credentials)
+    if not channel_info:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to authenticate YouTube channel"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Failed to get channel information"
         )
+    
+    # The fields are known and come from the YouTube API rather than the
+    # request body, so build the document directly instead of via a model
+    now = datetime.now(timezone.utc)
+    set_fields = {
+        "title": channel_info["title"],
+        "description": channel_info["description"],
+        "thumbnail_url": channel_info["thumbnail_url"],
+        "subscriber_count": channel_info["subscriber_count"],
+        "view_count": channel_info["view_count"],
+        "video_count": channel_info["video_count"],
+        "access_token": credentials.token,
+        "refresh_token": credentials.refresh_token,
+        "token_expires_at": credentials.expiry,
+        "updated_at": now
+    }
+    set_on_insert = {
+        "is_active": True,
+        "created_at": now
+    }
+    
+    # Create the channel or refresh the existing one in a single round trip
+    channel_doc = await db.youtube_channels.find_one_and_update(
+        {"channel_id": channel_info["channel_id"], "user_id": current_user.id},
+        {"$set": set_fields, "$setOnInsert": set_on_insert},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return YouTubeChannel.model_validate(channel_doc)
+
 
 @router.put("/channels/{channel_id}", response_model=YouTubeChannel)
 async def update_youtube_channel(
     channel_id: str,
     channel_update: YouTubeChannelUpdate,
+    db: AsyncIOMotorDatabase = Depends(get_db),
     current_user: User = Depends(get_current_user_dependency)
 ):
     """Update YouTube channel information"""
-    try:
-        db = get_database()
-        
-        # Check if channel exists and belongs to user
-        channel_doc = await db.youtube_channels.find_one({
-            "_id": ObjectId(channel_id),
-            "user_id": current_user.id
-        })
-        
-        if not channel_doc:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Channel not found"
-            )
-        
-        # Update channel
-        update_data = channel_update.dict(exclude_unset=True)
-        update_data["updated_at"] = datetime.utcnow()
-        
-        await db.youtube_channels.update_one(
-            {"_id": ObjectId(channel_id)},
-            {"$set": update_data}
-        )
-        
-        # Get updated channel
-        updated_channel_doc = await db.youtube_channels.find_one({"_id": ObjectId(channel_id)})
-        return YouTubeChannel(**updated_channel_doc)
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error updating YouTube channel: {e}")
+    channel_oid = parse_object_id(channel_id)
+    
+    # Update channel if it exists and belongs to user
+    update_data = channel_update.model_dump(exclude_unset=True)
+    update_data["updated_at"] = datetime.now(timezone.utc)
+    
+    updated_channel_doc = await db.youtube_channels.find_one_and_update(
+        {"_id": channel_oid, "user_id": current_user.id},
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
+    )
+    
+    if not updated_channel_doc:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to update YouTube channel"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Channel not found"
         )
+    
+    return YouTubeChannel.model_validate(updated_channel_doc)
+
 
 @router.delete("/channels/{channel_id}")
 async def delete_youtube_channel(
     channel_id: str,
+    db: AsyncIOMotorDatabase = Depends(get_db),
     current_user: User = Depends(get_current_user_dependency)
 ):
     """Delete YouTube channel connection"""
-    try:
-        db = get_database()
-        
-        # Check if channel exists and belongs to user
-        channel_doc = await db.youtube_channels.find_one({
-            "_id": ObjectId(channel_id),
-            "user_id": current_user.id
-        })
-        
-        if not channel_doc:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Channel not found"
-            )
-        
-        # Soft delete (set is_active to False)
-        await db.youtube_channels.update_one(
-            {"_id": ObjectId(channel_id)},
-            {
-                "$set": {
-                    "is_active": False,
-                    "updated_at": datetime.utcnow()
-                }
+    channel_oid = parse_object_id(channel_id)
+    
+    # Soft delete (set is_active to False) if channel exists and belongs to user
+    result = await db.youtube_channels.update_one(
+        {"_id": channel_oid, "user_id": current_user.id},
+        {
+            "$set": {
+                "is_active": False,
+                "updated_at": datetime.now(timezone.utc)
             }
-        )
-        
-        return {"message": "Channel disconnected successfully"}
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error deleting YouTube channel: {e}")
+        }
+    )
+    
+    if not result.matched_count:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to delete YouTube channel"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Channel not found"
         )
+    
+    return {"message": "Channel disconnected successfully"}
+
 
 @router.get("/channels/{channel_id}/info")
 async def get_channel_info(
     channel_id: str,
+    db: AsyncIOMotorDatabase = Depends(get_db),
     current_user: User = Depends(get_current_user_dependency)
 ):
     """Get detailed channel information from YouTube API"""
-    try:
-        db = get_database()
-        
-        # Get channel from database
-        channel_doc = await db.youtube_channels.find_one({
-            "_id": ObjectId(channel_id),
-            "user_id": current_user.id,
-            "is_active": True
-        })
-        
-        if not channel_doc:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Channel not found"
-            )
-        
-        # Get credentials
-        credentials = youtube_service.get_credentials_from_token(
-            channel_doc["access_token"],
-            channel_doc["refresh_token"]
+    channel_oid = parse_object_id(channel_id)
+    
+    # Get channel from database
+    channel_doc = await db.youtube_channels.find_one(
+        {"_id": channel_oid, "user_id": current_user.id, "is_active": True},
+        projection={"access_token": 1, "refresh_token": 1, "token_expires_at": 1}
+    )
+    
+    if not channel_doc:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Channel not found"
+        )
+    
+    # Get credentials
+    credentials = get_credentials(channel_doc)
+    
+    # Refresh credentials if needed
+    credentials = await run_in_threadpool(refresh_credentials, credentials)
+    if not credentials:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Failed to refresh credentials"
+        )
+    if credentials.token != channel_doc["access_token"]:
+        await db.youtube_channels.update_one(
+            {"_id": channel_oid},
+            {"$set": {"access_token": credentials.token, "token_expires_at": credentials.expiry}}
         )
-        
-        # Refresh credentials if needed
-        credentials = youtube_service.refresh_credentials(credentials)
-        if not credentials:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Failed to refresh credentials"
-            )
-        
-        # Get fresh channel info from YouTube
-        channel_info = await youtube_service.get_channel_info(credentials)
-        if not channel_info:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Failed to get channel information"
-            )
-        
-        return channel_info
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting channel info: {e}")
+    
+    # Get fresh channel info from YouTube
+    channel_info = await run_in_threadpool(youtube_service.get_channel_info, credentials)
+    if not channel_info:
         raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            status_code=status.HTTP_400_BAD_REQUEST,
             detail="Failed to get channel information"
         )
+    
+    return channel_info
@@ -1,19 +1,54 @@
 from fastapi import HTTPException, status
+from google.auth import exceptions as google_auth_exceptions, jwt as google_jwt
 from google.auth.transport import requests
-from google.oauth2 import id_token
 from google_auth_oauthlib.flow import Flow
 from app.config import settings
-from app.models.user import User, UserCreate
+from app.models.user import User, validate_email
 from app.database import get_database
+from pymongo import ReturnDocument
 from typing import Optional, Dict, Any
-from datetime import datetime
+from datetime import datetime, timezone
+from cachetools import TTLCache
+import asyncio
+import hashlib
+import json
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+
+# One transport for all verifications so the HTTPS connection is reused
+_google_request = requests.Request()
+# Google publishes new signing keys well before using them, so an hour-old
+# copy of the certificates still verifies every current token
+_google_certs_cache = TTLCache(1, ttl=3600)
+
+# Verified Google ID tokens, so a repeated login skips the signature check
+_google_token_cache = TTLCache(maxsize=10_000, ttl=300)
+# Tokens this close to expiry are verified again rather than served from the cache
+GOOGLE_TOKEN_EXPIRY_MARGIN = 30
+
+def _get_google_certs() -> Dict[str, str]:
+    """Return Google's ID token signing certificates, fetching them at most hourly"""
+    certs = _google_certs_cache.get(GOOGLE_CERTS_URL)
+    if certs is None:
+        response = _google_request(GOOGLE_CERTS_URL, method="GET")
+        if response.status != 200:
+            raise google_auth_exceptions.TransportError(
+                f"Could not fetch certificates at {GOOGLE_CERTS_URL}"
+            )
+        certs = json.loads(response.data)
+        _google_certs_cache[GOOGLE_CERTS_URL] = certs
+    return certs
+
+def _decode_google_id_token(token: str) -> Dict[str, Any]:
+    """Blocking equivalent of id_token.verify_oauth2_token using the cached certificates"""
+    return google_jwt.decode(token, certs=_get_google_certs(), audience=settings.GOOGLE_CLIENT_ID)
+
 class AuthService:
     def __init__(self):
-        self.db = get_database()
         self.client_config = {
             "web": {
                 "client_id": settings.GOOGLE_CLIENT_ID,
@@ -24,6 +59,11 @@ class AuthService:
             }
         }
     
+    @property
+    def db(self):
+        """Shared database handle; only available once the app has connected"""
+        return get_database()
+    
     def get_google_flow(self) -> Flow:
         """Create Google OAuth flow"""
         flow = Flow.from_client_config(
@@ -41,22 +81,29 @@ class AuthService:
     
     async def verify_google_token(self, token: str) -> Dict[str, Any]:
         """Verify Google ID token and return user info"""
+        # Keyed by a digest so raw tokens are never held in memory
+        key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        cached = _google_token_cache.get(key)
+        if cached is not None:
+            user_data, expires_at = cached
+            if expires_at > time.time() + GOOGLE_TOKEN_EXPIRY_MARGIN:
+                return dict(user_data)
+        
         try:
-            idinfo = id_token.verify_oauth2_token(
-                token, 
-                requests.Request(), 
-                settings.GOOGLE_CLIENT_ID
-            )
+            # Certificate fetches and RSA verification are blocking, keep them off the event loop
+            idinfo = await asyncio.to_thread(_decode_google_id_token, token)
             
             if idinfo['iss'] not in ['accounts.google.com', 'https://accounts.google.com']:
                 raise ValueError('Wrong issuer.')
             
-            return {
+            user_data = {
                 "google_id": idinfo['sub'],
                 "email": idinfo['email'],
                 "name": idinfo['name'],
                 "picture": idinfo.get('picture')
             }
+            _google_token_cache[key] = (user_data, idinfo['exp'])
+            return dict(user_data)
         except ValueError as e:
             logger.error(f"Token verification failed: {e}")
             raise HTTPException(
@@ -67,44 +114,29 @@ class AuthService:
     async def get_or_create_user(self, user_data: Dict[str, Any]) -> User:
         """Get existing user or create new one"""
         try:
-            # Try to find existing user
-            user_doc = await self.db.users.find_one({"google_id": user_data["google_id"]})
+            now = datetime.now(timezone.utc)
+            # The upsert can't tell new users from returning ones, so every login checks the email
+            set_fields = {
+                "email": validate_email(user_data["email"]),
+                "name": user_data["name"],
+                "picture": user_data.get("picture"),
+                "updated_at": now
+            }
+            set_on_insert = {
+                "created_at": now,
+                "is_active": True,
+                "youtube_channels": []
+            }
             
-            if user_doc:
-                # Update user info
-                await self.db.users.update_one(
-                    {"google_id": user_data["google_id"]},
-                    {
-                        "$set": {
-                            "email": user_data["email"],
-                            "name": user_data["name"],
-                            "picture": user_data.get("picture"),
-                            "updated_at": datetime.utcnow()
-                        }
-                    }
-                )
-                user_doc = await self.db.users.find_one({"google_id": user_data["google_id"]})
-            else:
-                # Create new user
-                user_create = UserCreate(
-                    email=user_data["email"],
-                    name=user_data["name"],
-                    google_id=user_data["google_id"],
-                    picture=user_data.get("picture")
-                )
-                
-                user_dict = user_create.dict()
-                user_dict.update({
-                    "created_at": datetime.utcnow(),
-                    "updated_at": datetime.utcnow(),
-                    "is_active": True,
-                    "youtube_channels": []
-                })
-                
-                result = await self.db.users.insert_one(user_dict)
-                user_doc = await self.db.users.find_one({"_id": result.inserted_id})
+            # Refresh the existing user or create a new one in a single round trip
+            user_doc = await self.db.users.find_one_and_update(
+                {"google_id": user_data["google_id"]},
+                {"$set": set_fields, "$setOnInsert": set_on_insert},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
             
-            return User(**user_doc)
+            return User.model_validate(user_doc)
             
         except Exception as e:
             logger.error(f"Error in get_or_create_user: {e}")
@@ -119,7 +151,9 @@ class AuthService:
             from bson import ObjectId
             user_doc = await self.db.users.find_one({"_id": ObjectId(user_id)})
             if user_doc:
-                return User(**user_doc)
+                # Documents in users are only ever written by get_or_create_user,
+                # so they are already valid and can skip validation on this hot path
+                return User.model_construct(id=user_doc.pop("_id"), **user_doc)
             return None
         except Exception as e:
             logger.error(f"Error getting user by ID: {e}")
@@ -0,0 +1,70 @@
+from google.oauth2.credentials import Credentials
+from app.config import settings
+from app.services.token_cache import token_cache
+from cachetools import TTLCache
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any
+import hashlib
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+TOKEN_URI = "https://oauth2.googleapis.com/token"
+
+# One Credentials object per (client_id, refresh_token), reused by the services and tasks
+_credentials_cache = TTLCache(maxsize=1024, ttl=3600)
+_credentials_lock = threading.Lock()
+
+def _naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # google-auth compares expiry against a naive UTC clock
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def get_credentials_from_token(access_token: str, refresh_token: str, expiry: Optional[datetime] = None) -> Credentials:
+    """Get credentials for stored tokens, reusing the object already built for the refresh token"""
+    expiry = _naive_utc(expiry)
+    key = (settings.GOOGLE_CLIENT_ID, hashlib.sha256(refresh_token.encode()).digest())
+    with _credentials_lock:
+        creds = _credentials_cache.get(key)
+        if creds is None:
+            creds = Credentials(
+                token=access_token,
+                refresh_token=refresh_token,
+                token_uri=TOKEN_URI,
+                client_id=settings.GOOGLE_CLIENT_ID,
+                client_secret=settings.GOOGLE_CLIENT_SECRET,
+                scopes=settings.youtube_scopes_list,
+                expiry=expiry
+            )
+            _credentials_cache[key] = creds
+        elif expiry is None or creds.expiry is None or expiry >= creds.expiry:
+            # Keep the cached token only when it is known to outlive the caller's
+            creds.token = access_token
+            creds.expiry = expiry
+    token_cache.apply(creds)
+    return creds
+
+def get_credentials(channel_doc: Dict[str, Any]) -> Credentials:
+    """Get credentials for a stored YouTube channel"""
+    return get_credentials_from_token(
+        channel_doc["access_token"],
+        channel_doc["refresh_token"],
+        channel_doc.get("token_expires_at")
+    )
+
+def expires_soon(credentials: Credentials) -> bool:
+    """Whether the access token is known to expire within the refresh margin"""
+    return (
+        credentials.expiry is not None
+        and credentials.expiry <= _naive_utc(datetime.now(timezone.utc)) + token_cache.expiry_margin
+    )
+
+def refresh_credentials(credentials: Credentials) -> Optional[Credentials]:
+    """Refresh credentials that are expired or about to expire"""
+    try:
+        return token_cache.refresh(credentials)
+    except Exception as e:
+        logger.error(f"Error refreshing credentials: {e}")
+        return None
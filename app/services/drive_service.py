@@ -1,52 +1,42 @@
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.http import MediaIoBaseUpload
 from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import Flow
-from app.config import settings
-from typing import Optional, Dict, Any
+from app.services.google_clients import get_service, discard_service_on_unauthorized, resumable_chunk_size
+from typing import Optional, Dict, Any, BinaryIO
 import logging
 import os
-import mimetypes
 
 logger = logging.getLogger(__name__)
 
+# Types of the video files this service handles, by extension
+_EXT_MIME = {
+    ".mp4": "video/mp4",
+    ".mov": "video/quicktime",
+    ".webm": "video/webm",
+    ".mkv": "video/x-matroska",
+    ".avi": "video/x-msvideo",
+    ".wmv": "video/x-ms-wmv",
+    ".flv": "video/x-flv"
+}
+
 class DriveService:
-    def __init__(self):
-        self.client_config = {
-            "web": {
-                "client_id": settings.GOOGLE_CLIENT_ID,
-                "client_secret": settings.GOOGLE_CLIENT_SECRET,
-                "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-                "token_uri": "https://oauth2.googleapis.com/token",
-                "redirect_uris": [settings.GOOGLE_REDIRECT_URI]
-            }
-        }
-    
-    def get_credentials_from_token(self, access_token: str, refresh_token: str) -> Credentials:
-        """Create credentials from stored tokens"""
-        creds = Credentials(
-            token=access_token,
-            refresh_token=refresh_token,
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=settings.GOOGLE_CLIENT_ID,
-            client_secret=settings.GOOGLE_CLIENT_SECRET,
-            scopes=settings.youtube_scopes_list
-        )
-        return creds
-    
     def get_drive_service(self, credentials: Credentials):
         """Get Google Drive service instance"""
-        return build('drive', 'v3', credentials=credentials)
+        return get_service('drive', 'v3', credentials)
     
-    async def upload_video(self, file_path: str, file_name: str, credentials: Credentials) -> Dict[str, Any]:
-        """Upload video to Google Drive"""
+    def upload_video(
+        self,
+        file_obj: BinaryIO,
+        file_name: str,
+        credentials: Credentials,
+        mime_type: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Upload video to Google Drive from a seekable file object"""
         try:
             service = self.get_drive_service(credentials)
             
-            # Get file metadata
-            file_size = os.path.getsize(file_path)
-            mime_type, _ = mimetypes.guess_type(file_path)
+            # Fall back to the file name when the caller doesn't know the type
+            if not mime_type:
+                mime_type = _EXT_MIME.get(os.path.splitext(file_name)[1].lower(), "application/octet-stream")
             
             # Create file metadata
             file_metadata = {
@@ -55,11 +45,13 @@ class DriveService:
             }
             
             # Create media upload
-            media = MediaFileUpload(
-                file_path,
+            file_size = file_obj.seek(0, os.SEEK_END)
+            file_obj.seek(0)
+            media = MediaIoBaseUpload(
+                file_obj,
                 mimetype=mime_type,
                 resumable=True,
-                chunksize=1024*1024  # 1MB chunks
+                chunksize=resumable_chunk_size(file_size)
             )
             
             # Upload file
@@ -80,10 +72,11 @@ class DriveService:
             }
             
         except Exception as e:
+            discard_service_on_unauthorized(e, 'drive', 'v3', credentials)
             logger.error(f"Error uploading video to Drive: {e}")
             raise Exception(f"Failed to upload video: {str(e)}")
     
-    async def delete_video(self, file_id: str, credentials: Credentials) -> bool:
+    def delete_video(self, file_id: str, credentials: Credentials) -> bool:
         """Delete video from Google Drive"""
         try:
             service = self.get_drive_service(credentials)
@@ -91,10 +84,11 @@ class DriveService:
             logger.info(f"Video deleted successfully: {file_id}")
             return True
         except Exception as e:
+            discard_service_on_unauthorized(e, 'drive', 'v3', credentials)
             logger.error(f"Error deleting video from Drive: {e}")
             return False
     
-    async def get_video_info(self, file_id: str, credentials: Credentials) -> Optional[Dict[str, Any]]:
+    def get_video_info(self, file_id: str, credentials: Credentials) -> Optional[Dict[str, Any]]:
         """Get video information from Google Drive"""
         try:
             service = self.get_drive_service(credentials)
@@ -113,18 +107,8 @@ class DriveService:
                 "modified_time": file.get('modifiedTime')
             }
         except Exception as e:
+            discard_service_on_unauthorized(e, 'drive', 'v3', credentials)
             logger.error(f"Error getting video info from Drive: {e}")
             return None
-    
-    async def refresh_credentials(self, credentials: Credentials) -> Optional[Credentials]:
-        """Refresh expired credentials"""
-        try:
-            if credentials.expired and credentials.refresh_token:
-                credentials.refresh(Request())
-                return credentials
-            return credentials
-        except Exception as e:
-            logger.error(f"Error refreshing credentials: {e}")
-            return None
 
 drive_service = DriveService()
@@ -0,0 +1,102 @@
+from googleapiclient.discovery import build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
+from googleapiclient.model import JsonModel
+from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
+from cachetools import TTLCache
+from typing import Any, BinaryIO, Dict, Tuple
+import hashlib
+import orjson
+import os
+import threading
+
+# Resumable uploads are sent in 8MB chunks, a multiple of the required 256KB granularity
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+# Below this size the whole file is streamed in a single request
+SINGLE_REQUEST_UPLOAD_LIMIT = 100 * 1024 * 1024
+
+# Parsed discovery documents, loaded once per process from the copies bundled with the client
+_discovery_documents: Dict[Tuple[str, str], Dict[str, Any]] = {}
+# Built API clients; access tokens last an hour, so entries expire a little before that
+_service_cache = TTLCache(maxsize=1024, ttl=3000)
+_service_cache_lock = threading.Lock()
+# One HTTP transport per thread, shared by every client that thread builds
+_thread_local = threading.local()
+
+class OrjsonModel(JsonModel):
+    """JsonModel that parses response bodies with orjson"""
+
+    def deserialize(self, content):
+        try:
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # Like JsonModel, hand back bodies that are not JSON as text
+            return content.decode("utf-8") if isinstance(content, bytes) else content
+        if self._data_wrapper and "data" in body:
+            body = body["data"]
+        return body
+
+def _get_discovery_document(api: str, version: str) -> Dict[str, Any]:
+    """Return the parsed discovery document for an API, reading it only once"""
+    document = _discovery_documents.get((api, version))
+    if document is None:
+        document = orjson.loads(get_static_doc(api, version))
+        _discovery_documents[(api, version)] = document
+    return document
+
+def preload_discovery_documents(*apis: Tuple[str, str]) -> None:
+    """Parse discovery documents ahead of the first API call, e.g. at worker start"""
+    for api, version in apis:
+        _get_discovery_document(api, version)
+
+def _get_thread_http():
+    """Return the current thread's transport, so its open connections outlive any one token"""
+    http = getattr(_thread_local, "http", None)
+    if http is None:
+        # build_http applies the client's timeout and leaves 308 to the resumable upload logic
+        http = _thread_local.http = build_http()
+    return http
+
+def _service_key(api: str, version: str, credentials: Credentials) -> Tuple[Any, ...]:
+    token_hash = hashlib.sha256((credentials.token or "").encode()).digest()
+    # The underlying httplib2.Http is not thread-safe, so clients are never shared across threads
+    return (api, version, credentials.client_id, token_hash, threading.get_ident())
+
+def get_service(api: str, version: str, credentials: Credentials):
+    """Get an API client for the credentials, reusing one built earlier for the same token"""
+    key = _service_key(api, version, credentials)
+    with _service_cache_lock:
+        service = _service_cache.get(key)
+    if service is None:
+        document = _get_discovery_document(api, version)
+        service = build_from_document(
+            document,
+            http=AuthorizedHttp(credentials, http=_get_thread_http()),
+            model=OrjsonModel("dataWrapper" in document.get("features", []))
+        )
+        with _service_cache_lock:
+            _service_cache[key] = service
+    return service
+
+def discard_service_on_unauthorized(error: Exception, api: str, version: str, credentials: Credentials) -> None:
+    """Drop the cached client when the API rejected its credentials"""
+    if isinstance(error, HttpError) and error.resp.status == 401:
+        with _service_cache_lock:
+            _service_cache.pop(_service_key(api, version, credentials), None)
+
+def resumable_chunk_size(size: int) -> int:
+    """Chunk size for a resumable upload, -1 meaning one request for the whole file"""
+    return -1 if size < SINGLE_REQUEST_UPLOAD_LIMIT else UPLOAD_CHUNK_SIZE
+
+def open_upload_source(path: str) -> BinaryIO:
+    """Open a local file for a resumable upload, buffered to the chunk size
+
+    Sequential access advice lets the kernel read ahead, so the next chunk
+    is usually already in the page cache while the current one is sent.
+    """
+    source = open(path, "rb", buffering=UPLOAD_CHUNK_SIZE)
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(source.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+    return source
@@ -0,0 +1,75 @@
+from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
+from cachetools import TTLCache
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
+import hashlib
+import threading
+
+def _utcnow() -> datetime:
+    # google-auth keeps credential expiry as a naive UTC datetime
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+class OAuthTokenCache:
+    """Process-wide access tokens keyed by (client_id, refresh_token)
+
+    Refreshes are coalesced per key, so concurrent tasks for the same channel
+    hit the token endpoint once instead of each refreshing on their own.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: int = 3600, expiry_margin: timedelta = timedelta(seconds=60)):
+        self.expiry_margin = expiry_margin
+        self._tokens = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._key_locks = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._request = Request()
+
+    def _key(self, credentials: Credentials) -> Tuple[str, bytes]:
+        # Keyed by a digest so refresh tokens are never used as dict keys
+        return (credentials.client_id, hashlib.sha256(credentials.refresh_token.encode()).digest())
+
+    def _key_lock(self, key: Tuple[str, bytes]) -> threading.Lock:
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def _is_fresh(self, expiry: Optional[datetime]) -> bool:
+        return expiry is not None and expiry - self.expiry_margin > _utcnow()
+
+    def apply(self, credentials: Credentials) -> bool:
+        """Swap in a cached access token that is fresher than the one on the credentials"""
+        if not credentials.refresh_token:
+            return False
+        with self._lock:
+            cached = self._tokens.get(self._key(credentials))
+        if cached is None:
+            return False
+        token, expiry = cached
+        if not self._is_fresh(expiry):
+            return False
+        if credentials.expiry is None or expiry > credentials.expiry:
+            credentials.token = token
+            credentials.expiry = expiry
+        return True
+
+    def refresh(self, credentials: Credentials) -> Credentials:
+        """Make sure the credentials hold a token that is not about to expire"""
+        if not credentials.refresh_token:
+            return credentials
+        # Without a known expiry the token is used as is; the client refreshes on a 401
+        if credentials.token and (credentials.expiry is None or self._is_fresh(credentials.expiry)):
+            return credentials
+
+        key = self._key(credentials)
+        with self._key_lock(key):
+            # Another thread may have refreshed while we waited for the lock
+            if self.apply(credentials):
+                return credentials
+            credentials.refresh(self._request)
+            with self._lock:
+                self._tokens[key] = (credentials.token, credentials.expiry)
+        return credentials
+
+token_cache = OAuthTokenCache()
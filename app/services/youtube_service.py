@@ -1,36 +1,78 @@
-from googleapiclient.discovery import build
-from googleapiclient.http import MediaFileUpload
+from googleapiclient.http import MediaIoBaseUpload
 from google.oauth2.credentials import Credentials
-from google.auth.transport.requests import Request
-from app.config import settings
-from typing import Optional, Dict, Any, List
+from app.services.google_clients import get_service, discard_service_on_unauthorized, open_upload_source, resumable_chunk_size
+from cachetools import TTLCache
+from typing import Optional, Dict, Any, Callable, List, Tuple
+import hashlib
 import logging
 import os
+import threading
 
 logger = logging.getLogger(__name__)
 
+# Calls per batch HTTP request
+BATCH_SIZE = 100
+
+# Resource parts sent with videos().insert, matching the keys of the upload body
+_YT_INSERT_PARTS = 'snippet,status'
+# People & Blogs category
+_YT_CATEGORY_ID = '22'
+# Upload progress is reported in steps of this many percent
+PROGRESS_STEP = 5
+
+# Video statistics change slowly and channel metadata even more so
+_video_info_cache = TTLCache(maxsize=1024, ttl=60)
+_channel_info_cache = TTLCache(maxsize=1024, ttl=600)
+_info_cache_lock = threading.Lock()
+
+def _account_key(credentials: Credentials) -> Tuple[str, bytes]:
+    # Cached info is scoped to the account, so it is never served to another user
+    secret = credentials.refresh_token or credentials.token or ""
+    return (credentials.client_id, hashlib.sha256(secret.encode()).digest())
+
+def _get_cached_info(cache: TTLCache, key: Tuple[Any, ...]) -> Optional[Dict[str, Any]]:
+    with _info_cache_lock:
+        info = cache.get(key)
+    # Callers get their own copy to change
+    return dict(info) if info is not None else None
+
+def _cache_info(cache: TTLCache, key: Tuple[Any, ...], info: Dict[str, Any]) -> Dict[str, Any]:
+    with _info_cache_lock:
+        cache[key] = info
+    return dict(info)
+
+def _run_upload(insert_request, progress_callback: Optional[Callable[[float], None]] = None) -> Dict[str, Any]:
+    """Send a resumable insert request chunk by chunk and return the API response"""
+    response = None
+    next_report = PROGRESS_STEP
+    while response is None:
+        status, response = insert_request.next_chunk()
+        if status is None or not status.total_size:
+            continue
+        percent = status.resumable_progress * 100 // status.total_size
+        if percent >= next_report:
+            logger.info(f"Upload progress: {percent}%")
+            if progress_callback is not None:
+                progress_callback(status.resumable_progress / status.total_size)
+            next_report = percent - percent % PROGRESS_STEP + PROGRESS_STEP
+    return response
+
 class YouTubeService:
     def __init__(self):
         pass
     
-    def get_credentials_from_token(self, access_token: str, refresh_token: str) -> Credentials:
-        """Create credentials from stored tokens"""
-        creds = Credentials(
-            token=access_token,
-            refresh_token=refresh_token,
-            token_uri="https://oauth2.googleapis.com/token",
-            client_id=settings.GOOGLE_CLIENT_ID,
-            client_secret=settings.GOOGLE_CLIENT_SECRET,
-            scopes=settings.youtube_scopes_list
-        )
-        return creds
-    
     def get_youtube_service(self, credentials: Credentials):
         """Get YouTube service instance"""
-        return build('youtube', 'v3', credentials=credentials)
+        return get_service('youtube', 'v3', credentials)
     
-    async def upload_video(self, file_path: str, video_data: Dict[str, Any], credentials: Credentials) -> Dict[str, Any]:
-        """Upload video to YouTube"""
+    def upload_video(
+        self,
+        file_path: str,
+        video_data: Dict[str, Any],
+        credentials: Credentials,
+        progress_callback: Optional[Callable[[float], None]] = None
+    ) -> Dict[str, Any]:
+        """Upload video to YouTube, reporting the fraction sent as the upload progresses"""
         try:
             service = self.get_youtube_service(credentials)
             
@@ -40,7 +82,7 @@ class YouTubeService:
                     'title': video_data.get('title', 'Untitled Video'),
                     'description': video_data.get('description', ''),
                     'tags': video_data.get('tags', []),
-                    'categoryId': '22'  # People & Blogs category
+                    'categoryId': _YT_CATEGORY_ID
                 },
                 'status': {
                     'privacyStatus': video_data.get('privacy', 'private'),
@@ -48,27 +90,24 @@ class YouTubeService:
                 }
             }
             
-            # Create media upload
-            media = MediaFileUpload(
-                file_path,
-                mimetype='video/*',
-                resumable=True,
-                chunksize=1024*1024  # 1MB chunks
-            )
-            
-            # Upload video
-            insert_request = service.videos().insert(
-                part=','.join(body.keys()),
-                body=body,
-                media_body=media
-            )
-            
-            # Execute upload
-            response = None
-            while response is None:
-                status, response = insert_request.next_chunk()
-                if status:
-                    logger.info(f"Upload progress: {int(status.progress() * 100)}%")
+            with open_upload_source(file_path) as video_file:
+                # Create media upload
+                media = MediaIoBaseUpload(
+                    video_file,
+                    mimetype='video/*',
+                    resumable=True,
+                    chunksize=resumable_chunk_size(os.fstat(video_file.fileno()).st_size)
+                )
+                
+                # Upload video
+                insert_request = service.videos().insert(
+                    part=_YT_INSERT_PARTS,
+                    body=body,
+                    media_body=media
+                )
+                
+                # Execute upload
+                response = _run_upload(insert_request, progress_callback)
             
             if 'id' in response:
                 video_id = response['id']
@@ -86,10 +125,11 @@ class YouTubeService:
                 raise Exception("Upload failed - no video ID returned")
                 
         except Exception as e:
+            discard_service_on_unauthorized(e, 'youtube', 'v3', credentials)
             logger.error(f"Error uploading video to YouTube: {e}")
             raise Exception(f"Failed to upload video to YouTube: {str(e)}")
     
-    async def delete_video(self, video_id: str, credentials: Credentials) -> bool:
+    def delete_video(self, video_id: str, credentials: Credentials) -> bool:
         """Delete video from YouTube"""
         try:
             service = self.get_youtube_service(credentials)
@@ -97,11 +137,47 @@ class YouTubeService:
             logger.info(f"Video deleted successfully from YouTube: {video_id}")
             return True
         except Exception as e:
+            discard_service_on_unauthorized(e, 'youtube', 'v3', credentials)
             logger.error(f"Error deleting video from YouTube: {e}")
             return False
     
-    async def get_video_info(self, video_id: str, credentials: Credentials) -> Optional[Dict[str, Any]]:
-        """Get video information from YouTube"""
+    def delete_videos(self, video_ids: List[str], credentials: Credentials) -> Tuple[List[str], List[str]]:
+        """Delete videos from YouTube in batch requests, returning the deleted and failed ids"""
+        deleted: List[str] = []
+        failed: List[str] = []
+        
+        def on_delete(request_id, response, exception):
+            if exception is None:
+                deleted.append(request_id)
+            else:
+                logger.error(f"Error deleting video from YouTube: {request_id}: {exception}")
+                failed.append(request_id)
+        
+        service = self.get_youtube_service(credentials)
+        for start in range(0, len(video_ids), BATCH_SIZE):
+            chunk = video_ids[start:start + BATCH_SIZE]
+            batch = service.new_batch_http_request(callback=on_delete)
+            for video_id in chunk:
+                batch.add(service.videos().delete(id=video_id), request_id=video_id)
+            try:
+                batch.execute()
+            except Exception as e:
+                discard_service_on_unauthorized(e, 'youtube', 'v3', credentials)
+                logger.error(f"Error executing YouTube delete batch: {e}")
+                # Calls already answered keep their result, the rest are retried individually
+                answered = set(deleted) | set(failed)
+                failed.extend(video_id for video_id in chunk if video_id not in answered)
+        
+        logger.info(f"Deleted {len(deleted)} videos from YouTube in batch, {len(failed)} failed")
+        return deleted, failed
+    
+    def get_video_info(self, video_id: str, credentials: Credentials) -> Optional[Dict[str, Any]]:
+        """Get video information from YouTube, cached for a minute"""
+        key = (_account_key(credentials), video_id)
+        info = _get_cached_info(_video_info_cache, key)
+        if info is not None:
+            return info
+        
         try:
             service = self.get_youtube_service(credentials)
             response = service.videos().list(
@@ -117,7 +193,7 @@ class YouTubeService:
             status = video['status']
             statistics = video.get('statistics', {})
             
-            return {
+            return _cache_info(_video_info_cache, key, {
                 "video_id": video_id,
                 "title": snippet['title'],
                 "description": snippet['description'],
@@ -128,13 +204,19 @@ class YouTubeService:
                 "comment_count": statistics.get('commentCount', 0),
                 "published_at": snippet['publishedAt'],
                 "thumbnail_url": snippet['thumbnails']['default']['url']
-            }
+            })
         except Exception as e:
+            discard_service_on_unauthorized(e, 'youtube', 'v3', credentials)
             logger.error(f"Error getting video info from YouTube: {e}")
             return None
     
-    async def get_channel_info(self, credentials: Credentials) -> Optional[Dict[str, Any]]:
-        """Get authenticated user's channel information"""
+    def get_channel_info(self, credentials: Credentials) -> Optional[Dict[str, Any]]:
+        """Get authenticated user's channel information, cached for ten minutes"""
+        key = (_account_key(credentials),)
+        info = _get_cached_info(_channel_info_cache, key)
+        if info is not None:
+            return info
+        
         try:
             service = self.get_youtube_service(credentials)
             response = service.channels().list(
@@ -149,7 +231,7 @@ class YouTubeService:
             snippet = channel['snippet']
             statistics = channel['statistics']
             
-            return {
+            return _cache_info(_channel_info_cache, key, {
                 "channel_id": channel['id'],
                 "title": snippet['title'],
                 "description": snippet['description'],
@@ -157,20 +239,10 @@ class YouTubeService:
                 "subscriber_count": int(statistics.get('subscriberCount', 0)),
                 "view_count": int(statistics.get('viewCount', 0)),
                 "video_count": int(statistics.get('videoCount', 0))
-            }
+            })
         except Exception as e:
+            discard_service_on_unauthorized(e, 'youtube', 'v3', credentials)
             logger.error(f"Error getting channel info: {e}")
             return None
-    
-    async def refresh_credentials(self, credentials: Credentials) -> Optional[Credentials]:
-        """Refresh expired credentials"""
-        try:
-            if credentials.expired and credentials.refresh_token:
-                credentials.refresh(Request())
-                return credentials
-            return credentials
-        except Exception as e:
-            logger.error(f"Error refreshing credentials: {e}")
-            return None
 
 youtube_service = YouTubeService()
@@ -1,13 +1,19 @@
-from celery import Celery
+from celery import Celery, group
+from celery.signals import worker_process_init
 from app.config import settings
 from app.services.youtube_service import youtube_service
 from app.services.drive_service import drive_service
-from app.database import get_database
+from app.services.credentials import get_credentials, expires_soon, refresh_credentials
+from app.services.google_clients import preload_discovery_documents
 from app.models.video import VideoStatus
-from typing import Dict, Any
-from datetime import datetime
+from typing import Dict, Any, List, Optional
+from collections import defaultdict
+from pymongo import MongoClient, UpdateOne
+from bson import ObjectId
+from datetime import datetime, timedelta, timezone
 import logging
 import os
+import uuid
 
 logger = logging.getLogger(__name__)
 
@@ -18,35 +24,125 @@ celery_app = Celery(
     backend=settings.REDIS_URL
 )
 
+celery_app.mongo = None
+
+# A prefork child runs one synchronous task at a time, so it needs only a few
+# connections and keeps none open while idle
+TASK_MONGODB_MAX_POOL_SIZE = 4
+
+def create_mongo_client() -> MongoClient:
+    return MongoClient(
+        settings.MONGODB_URL,
+        maxPoolSize=TASK_MONGODB_MAX_POOL_SIZE,
+        minPoolSize=0,
+        maxIdleTimeMS=settings.MONGODB_MAX_IDLE_TIME_MS,
+        waitQueueTimeoutMS=settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS
+    )
+
+@worker_process_init.connect
+def init_worker_process(**kwargs):
+    """Give each worker process its own long-lived MongoDB client and parsed API documents"""
+    # pymongo clients are not fork-safe, so they are created after the fork
+    celery_app.mongo = create_mongo_client()
+    preload_discovery_documents(("youtube", "v3"), ("drive", "v3"))
+
+def get_task_database():
+    """Database handle for tasks; pools without forked children create the client lazily"""
+    if celery_app.mongo is None:
+        celery_app.mongo = create_mongo_client()
+    return celery_app.mongo[settings.DATABASE_NAME]
+
+# Only the fields the tasks read; _id is always returned
+VIDEO_UPLOAD_PROJECTION = {"title": 1, "description": 1, "tags": 1, "privacy": 1, "google_drive_file_id": 1}
+CHANNEL_TOKEN_PROJECTION = {"access_token": 1, "refresh_token": 1, "token_expires_at": 1}
+VIDEO_CLEANUP_PROJECTION = {"user_id": 1, "schedule.youtube_video_id": 1, "schedule.youtube_channel_id": 1}
+
+# Videos claimed for deletion longer ago than this are claimed again by the next cleanup run
+DELETE_CLAIM_TIMEOUT = timedelta(hours=1)
+
+# Upload progress in percent, kept in the Celery result backend for a day
+UPLOAD_PROGRESS_KEY = "upload:{video_id}:progress"
+UPLOAD_PROGRESS_TTL = 24 * 60 * 60
+
+class UploadSourceUnavailable(Exception):
+    """The video file to upload cannot be obtained; retrying will not change that"""
+
+def get_upload_source(video_doc: Dict[str, Any]) -> str:
+    """Local path of the file to send to YouTube
+
+    Uploaded videos are only stored in Google Drive and nothing downloads
+    them for the worker yet, so no source is available.
+    """
+    raise UploadSourceUnavailable(
+        f"Upload source unavailable for video {video_doc['_id']}: "
+        f"Drive file {video_doc.get('google_drive_file_id')} is not downloaded to the worker"
+    )
+
+def save_refreshed_token(db, channel_doc: Dict[str, Any], credentials) -> None:
+    """Persist an access token that was refreshed, so later tasks start from it"""
+    if credentials.token != channel_doc['access_token']:
+        db.youtube_channels.update_one(
+            {"_id": channel_doc['_id']},
+            {"$set": {"access_token": credentials.token, "token_expires_at": credentials.expiry}}
+        )
+
+def report_upload_progress(video_id: str, progress: float) -> None:
+    """Publish upload progress in Redis, instead of writing it to the video document"""
+    try:
+        celery_app.backend.client.set(
+            UPLOAD_PROGRESS_KEY.format(video_id=video_id),
+            int(progress * 100),
+            ex=UPLOAD_PROGRESS_TTL
+        )
+    except Exception as e:
+        # Progress is informational, losing it must not fail the upload
+        logger.warning(f"Could not report upload progress for video {video_id}: {e}")
+
+def clear_upload_progress(video_id: str) -> None:
+    """Remove the progress of an upload that has finished, one way or the other"""
+    try:
+        celery_app.backend.client.delete(UPLOAD_PROGRESS_KEY.format(video_id=video_id))
+    except Exception as e:
+        logger.warning(f"Could not clear upload progress for video {video_id}: {e}")
+
+def get_upload_progress(video_id: str) -> Optional[int]:
+    """Percent sent of an upload in progress, or None when no upload is running"""
+    try:
+        progress = celery_app.backend.client.get(UPLOAD_PROGRESS_KEY.format(video_id=video_id))
+    except Exception as e:
+        logger.warning(f"Could not read upload progress for video {video_id}: {e}")
+        return None
+    return int(progress) if progress is not None else None
+
 @celery_app.task(bind=True)
 def upload_video_to_youtube(self, video_id: str, user_id: str, youtube_channel_id: str):
     """Upload video to YouTube as a background task"""
+    db = get_task_database()
+    video_oid = ObjectId(video_id)
     try:
-        db = get_database()
-        
-        # Get video and channel info
-        video_doc = db.videos.find_one({"_id": video_id})
-        channel_doc = db.youtube_channels.find_one({"_id": youtube_channel_id})
+        # Get video and channel info; a channel disconnected since scheduling is not used
+        video_doc = db.videos.find_one({"_id": video_oid}, VIDEO_UPLOAD_PROJECTION)
+        channel_doc = db.youtube_channels.find_one(
+            {"_id": ObjectId(youtube_channel_id), "user_id": ObjectId(user_id), "is_active": True},
+            CHANNEL_TOKEN_PROJECTION
+        )
         
         if not video_doc or not channel_doc:
             raise Exception("Video or channel not found")
-        
-        # Update video status to processing
-        db.videos.update_one(
-            {"_id": video_id},
-            {"$set": {"status": VideoStatus.PROCESSING}}
-        )
+        source_path = get_upload_source(video_doc)
         
         # Get credentials
-        credentials = youtube_service.get_credentials_from_token(
-            channel_doc['access_token'],
-            channel_doc['refresh_token']
-        )
+        credentials = get_credentials(channel_doc)
+        
+        # Refresh only tokens about to expire; the API client refreshes on a 401 otherwise
+        if expires_soon(credentials):
+            credentials = refresh_credentials(credentials)
+            if not credentials:
+                raise Exception("Failed to refresh credentials")
+        save_refreshed_token(db, channel_doc, credentials)
         
-        # Refresh credentials if needed
-        credentials = youtube_service.refresh_credentials(credentials)
-        if not credentials:
-            raise Exception("Failed to refresh credentials")
+        # Mark the upload as running; single-request uploads report no progress until they finish
+        report_upload_progress(video_id, 0.0)
         
         # Upload video to YouTube
         video_data = {
@@ -57,20 +153,22 @@ def upload_video_to_youtube(self, video_id: str, user_id: str, youtube_channel_i
         }
         
         result = youtube_service.upload_video(
-            video_doc['file_path'],
+            source_path,
             video_data,
-            credentials
+            credentials,
+            progress_callback=lambda progress: report_upload_progress(video_id, progress)
         )
         
         # Update video with YouTube info
+        now = datetime.now(timezone.utc)
         db.videos.update_one(
-            {"_id": video_id},
+            {"_id": video_oid},
             {
                 "$set": {
                     "status": VideoStatus.PUBLISHED,
                     "schedule.youtube_video_id": result['video_id'],
                     "schedule.youtube_url": result['video_url'],
-                    "updated_at": datetime.utcnow()
+                    "updated_at": now
                 }
             }
         )
@@ -83,34 +181,38 @@ def upload_video_to_youtube(self, video_id: str, user_id: str, youtube_channel_i
         
         # Update video status to failed
         db.videos.update_one(
-            {"_id": video_id},
+            {"_id": video_oid},
             {"$set": {"status": VideoStatus.FAILED}}
         )
         
+        if isinstance(e, UploadSourceUnavailable):
+            raise
         raise self.retry(exc=e, countdown=60, max_retries=3)
+        
+    finally:
+        clear_upload_progress(video_id)
 
-@celery_app.task(bind=True)
+@celery_app.task(bind=True, max_retries=3)
 def delete_video_from_youtube(self, video_id: str, youtube_video_id: str, user_id: str, youtube_channel_id: str):
     """Delete video from YouTube as a background task"""
+    db = get_task_database()
+    now = datetime.now(timezone.utc)
     try:
-        db = get_database()
-        
         # Get channel info
-        channel_doc = db.youtube_channels.find_one({"_id": youtube_channel_id})
+        channel_doc = db.youtube_channels.find_one({"_id": ObjectId(youtube_channel_id)}, CHANNEL_TOKEN_PROJECTION)
         
         if not channel_doc:
             raise Exception("Channel not found")
         
         # Get credentials
-        credentials = youtube_service.get_credentials_from_token(
-            channel_doc['access_token'],
-            channel_doc['refresh_token']
-        )
+        credentials = get_credentials(channel_doc)
         
-        # Refresh credentials if needed
-        credentials = youtube_service.refresh_credentials(credentials)
-        if not credentials:
-            raise Exception("Failed to refresh credentials")
+        # Refresh only tokens about to expire; the API client refreshes on a 401 otherwise
+        if expires_soon(credentials):
+            credentials = refresh_credentials(credentials)
+            if not credentials:
+                raise Exception("Failed to refresh credentials")
+        save_refreshed_token(db, channel_doc, credentials)
         
         # Delete video from YouTube
         success = youtube_service.delete_video(youtube_video_id, credentials)
@@ -118,13 +220,13 @@ def delete_video_from_youtube(self, video_id: str, youtube_video_id: str, user_i
         if success:
             # Update video status
             db.videos.update_one(
-                {"_id": video_id},
+                {"_id": ObjectId(video_id)},
                 {
                     "$set": {
                         "status": VideoStatus.DELETED,
                         "schedule.youtube_video_id": None,
                         "schedule.youtube_url": None,
-                        "updated_at": datetime.utcnow()
+                        "updated_at": now
                     }
                 }
             )
@@ -136,32 +238,142 @@ def delete_video_from_youtube(self, video_id: str, youtube_video_id: str, user_i
         
     except Exception as e:
         logger.error(f"Error deleting video {video_id}: {e}")
-        raise self.retry(exc=e, countdown=60, max_retries=3)
+        if self.request.retries >= self.max_retries:
+            # Out of retries, so record the failure instead of leaving the video claimed
+            db.videos.update_one(
+                {"_id": ObjectId(video_id)},
+                {"$set": {"status": VideoStatus.FAILED, "updated_at": now}}
+            )
+            raise
+        raise self.retry(exc=e, countdown=60)
+
+@celery_app.task(bind=True, max_retries=3)
+def delete_video_batch(
+    self,
+    youtube_channel_id: str,
+    videos: Dict[str, Dict[str, str]],
+    deleted: Optional[List[str]] = None,
+    failed: Optional[List[str]] = None
+):
+    """Delete one channel's claimed videos, keyed by YouTube video id, in batch requests
+
+    deleted and failed carry the outcome of the YouTube calls into a retry,
+    so a retry only repeats the database writes and never the deletes.
+    """
+    db = get_task_database()
+    now = datetime.now(timezone.utc)
+    try:
+        if deleted is None:
+            try:
+                channel_doc = None
+                if ObjectId.is_valid(youtube_channel_id):
+                    channel_doc = db.youtube_channels.find_one({"_id": ObjectId(youtube_channel_id)}, CHANNEL_TOKEN_PROJECTION)
+                credentials = None
+                if channel_doc:
+                    credentials = get_credentials(channel_doc)
+                    if expires_soon(credentials):
+                        credentials = refresh_credentials(credentials)
+                
+                if credentials:
+                    save_refreshed_token(db, channel_doc, credentials)
+                    deleted, failed = youtube_service.delete_videos(list(videos), credentials)
+                else:
+                    deleted, failed = [], list(videos)
+            except Exception as e:
+                logger.error(f"Error preparing video batch for channel {youtube_channel_id}: {e}")
+                # Nothing is known to be deleted, so every video goes through the per-video task
+                deleted, failed = [], list(videos)
+        
+        if deleted:
+            db.videos.bulk_write([
+                UpdateOne(
+                    {"_id": ObjectId(videos[youtube_video_id]['video_id'])},
+                    {
+                        "$set": {
+                            "status": VideoStatus.DELETED,
+                            "schedule.youtube_video_id": None,
+                            "schedule.youtube_url": None,
+                            "updated_at": now
+                        }
+                    }
+                )
+                for youtube_video_id in deleted
+            ], ordered=False)
+        
+        # Anything the batch could not delete goes through the retrying per-video task
+        for youtube_video_id in failed:
+            video = videos[youtube_video_id]
+            delete_video_from_youtube.delay(
+                video['video_id'],
+                youtube_video_id,
+                video['user_id'],
+                youtube_channel_id
+            )
+        
+        logger.info(f"Deleted {len(deleted)} of {len(videos)} expired videos for channel {youtube_channel_id}")
+        return {"deleted": len(deleted), "failed": len(failed)}
+        
+    except Exception as e:
+        logger.error(f"Error deleting video batch for channel {youtube_channel_id}: {e}")
+        raise self.retry(exc=e, countdown=60, kwargs={"deleted": deleted, "failed": failed})
 
 @celery_app.task
 def cleanup_expired_videos():
     """Clean up videos that are scheduled for deletion"""
     try:
-        db = get_database()
-        current_time = datetime.utcnow()
+        db = get_task_database()
+        now = datetime.now(timezone.utc)
         
-        # Find videos scheduled for deletion
-        videos_to_delete = db.videos.find({
-            "schedule.delete_scheduled_at": {"$lte": current_time},
-            "status": {"$in": [VideoStatus.PUBLISHED, VideoStatus.SCHEDULED]}
-        })
+        claim_id = uuid.uuid4().hex
         
+        # Claim the videos scheduled for deletion, so the next run cannot dispatch them again.
+        # Claims that were never completed are taken over once they time out.
+        result = db.videos.update_many(
+            {
+                "schedule.youtube_video_id": {"$nin": [None, ""]},
+                "$or": [
+                    {
+                        "status": {"$in": [VideoStatus.PUBLISHED, VideoStatus.SCHEDULED]},
+                        "schedule.delete_scheduled_at": {"$lte": now}
+                    },
+                    {
+                        "status": VideoStatus.DELETING,
+                        "schedule.delete_claimed_at": {"$lte": now - DELETE_CLAIM_TIMEOUT}
+                    }
+                ]
+            },
+            {
+                "$set": {
+                    "status": VideoStatus.DELETING,
+                    "schedule.delete_claimed_at": now,
+                    "schedule.delete_claim_id": claim_id
+                }
+            }
+        )
+        if not result.modified_count:
+            return
+        
+        videos_to_delete = db.videos.find(
+            {"status": VideoStatus.DELETING, "schedule.delete_claim_id": claim_id},
+            VIDEO_CLEANUP_PROJECTION
+        )
+        
+        # Group by channel so each channel's deletes share credentials and batch requests
+        videos_by_channel: Dict[Any, Dict[str, Dict[str, str]]] = defaultdict(dict)
         for video in videos_to_delete:
-            if video['schedule'].get('youtube_video_id'):
-                # Schedule deletion task
-                delete_video_from_youtube.delay(
-                    str(video['_id']),
-                    video['schedule']['youtube_video_id'],
-                    str(video['user_id']),
-                    str(video.get('youtube_channel_id', ''))
-                )
+            videos_by_channel[video['schedule'].get('youtube_channel_id')][video['schedule']['youtube_video_id']] = {
+                "video_id": str(video['_id']),
+                "user_id": str(video['user_id'])
+            }
+        
+        # One batch task per channel, so the channels are deleted in parallel across workers
+        if videos_by_channel:
+            group(
+                delete_video_batch.s(str(youtube_channel_id or ''), videos)
+                for youtube_channel_id, videos in videos_by_channel.items()
+            ).apply_async()
         
-        logger.info(f"Cleaned up {len(list(videos_to_delete))} expired videos")
+        logger.info(f"Dispatched {len(videos_by_channel)} delete batches for {result.modified_count} expired videos")
         
     except Exception as e:
         logger.error(f"Error in cleanup_expired_videos: {e}")
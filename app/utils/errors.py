@@ -0,0 +1,40 @@
+from app.utils.responses import ORJSONResponse
+import logging
+
+logger = logging.getLogger(__name__)
+
+class InternalErrorMiddleware:
+    """Pure ASGI middleware answering unhandled exceptions with a JSON 500
+
+    Installed inside CORSMiddleware, so the error response still carries the
+    CORS headers and the browser can read it.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        response_started = False
+
+        async def send_tracking_start(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_tracking_start)
+        except Exception as exc:
+            if response_started:
+                # Too late for an error response; let the server close the connection
+                raise
+            logger.error(f"Unhandled error on {scope['method']} {scope['path']}: {exc}")
+            response = ORJSONResponse(
+                status_code=500,
+                content={"detail": "Internal server error"}
+            )
+            await response(scope, receive, send)
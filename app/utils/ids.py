@@ -0,0 +1,13 @@
+from fastapi import HTTPException, status
+from bson import ObjectId
+from bson.errors import InvalidId
+
+def parse_object_id(value: str) -> ObjectId:
+    """Parse a path or query id, rejecting malformed ids before any DB call"""
+    try:
+        return ObjectId(value)
+    except (InvalidId, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid id: {value}"
+        )
@@ -0,0 +1,65 @@
+from app.utils.responses import ORJSONResponse
+
+# Room for the multipart boundaries and the form fields sent alongside the file
+MULTIPART_OVERHEAD = 1024 * 1024
+
+class UploadSizeLimitMiddleware:
+    """Pure ASGI middleware rejecting oversized upload bodies while they stream in
+
+    A declared Content-Length over the limit is refused before any of the body
+    is read; bodies without one are counted as they arrive so the multipart
+    parser never spools more than the limit to disk.
+    """
+
+    def __init__(self, app, path: str, max_body_size: int, detail: str):
+        self.app = app
+        self.path = path
+        self.max_body_size = max_body_size
+        self.detail = detail
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] != self.path:
+            await self.app(scope, receive, send)
+            return
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > self.max_body_size:
+                    await self.too_large_response(scope, receive, send)
+                    return
+                break
+
+        received = 0
+        exceeded = False
+
+        async def receive_limited():
+            nonlocal received, exceeded
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size:
+                    exceeded = True
+                    # Stops the multipart parser; the error it turns into is replaced below
+                    raise ValueError("Request body too large")
+            return message
+
+        response_replaced = False
+
+        async def send_unless_exceeded(message):
+            nonlocal response_replaced
+            if not exceeded:
+                await send(message)
+            elif message["type"] == "http.response.start":
+                response_replaced = True
+                await self.too_large_response(scope, receive, send)
+
+        try:
+            await self.app(scope, receive_limited, send_unless_exceeded)
+        except ValueError:
+            if not exceeded or response_replaced:
+                raise
+            await self.too_large_response(scope, receive, send)
+
+    async def too_large_response(self, scope, receive, send):
+        response = ORJSONResponse(status_code=413, content={"detail": self.detail})
+        await response(scope, receive, send)
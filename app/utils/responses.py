@@ -0,0 +1,17 @@
+from fastapi.responses import JSONResponse
+from bson import ObjectId
+from typing import Any
+import orjson
+
+def orjson_default(obj: Any) -> Any:
+    """Serialize types orjson does not handle natively"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson, with ObjectId support"""
+    media_type = "application/json"
+    
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=orjson_default, option=orjson.OPT_NON_STR_KEYS)
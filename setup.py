@@ -0,0 +1,22 @@
+from setuptools import Extension, setup
+from Cython.Build import cythonize
+
+# Compiles the Pydantic model modules in place (python setup.py build_ext --inplace).
+# app/ has no __init__.py files, so each extension is named explicitly; otherwise
+# the modules would be built under their bare names into the repository root.
+# Validation itself runs in pydantic-core either way; compiling only speeds up
+# the Python-level model code such as custom validators and the PyObjectId type.
+COMPILED_MODULES = [
+    "app.models.object_id",
+    "app.models.user",
+    "app.models.video",
+    "app.models.youtube_channel"
+]
+
+setup(
+    name="youtube-scheduler-models",
+    ext_modules=cythonize(
+        [Extension(module, [module.replace(".", "/") + ".py"]) for module in COMPILED_MODULES],
+        language_level=3
+    )
+)